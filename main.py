@@ -1,21 +1,90 @@
 from typing import List
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import cProfile
+import hashlib
+import os
+import sys
+import threading
+import time
 import typer
 import json
-import requests
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
-from markdownify import markdownify as md
 import re
-import pandas as pd
-import numpy as np
+from functools import lru_cache
 from rich import print
 import strict_rfc3339
 
+# pandas, numpy, requests, markdownify and asyncio are slow to import, they
+# are imported by the functions using them: a run without assessments never
+# loads pandas and numpy, and `--help` none of them.
+
 app = typer.Typer()
 
 IDEASCALE_URL = "https://cardano.ideascale.com"
+PROJECT_CATALYST_URL = "https://projectcatalyst.io"
 MAX_PAGES_TO_QUERY = 100
+# Consecutive pages failing before a stream of pages is given up (e.g. when
+# the network is down), the import has then to be resumed
+MAX_FAILED_PAGES = 3
+# Number of pages requested ahead of the one currently awaited in each
+# stream when fetching concurrently.
+PREFETCH_PAGES = 1
+# HTML fragments up to this length are memoized when converted to markdown
+STRIP_TAGS_CACHED_LENGTH = 1024
+STRIP_TAGS_CACHE_SIZE = 4096
+# Priorities of the requests going through the rate limiter: pages awaited
+# by the enumeration of proposals come before speculative prefetches.
+PRIORITY_PAGE = 0
+PRIORITY_PREFETCH = 1
+# Attempts of a request throttled by Ideascale (429) before giving up
+MAX_THROTTLED_ATTEMPTS = 6
+# Retries of a request failing with a server error, with exponential backoff
+MAX_RETRIES = 5
+SERVER_ERRORS = [500, 502, 503, 504]
+# Seconds between checks of a request from the event loop waiting behind
+# higher priority ones in the rate limiter
+RATE_LIMIT_POLL = 0.01
+# Engines used to send the requests to Ideascale
+ENGINES = ["threads", "async"]
+# Layouts of the JSON outputs, see JsonSerializer
+JSON_FORMATS = ["compat", "indented", "compact"]
+# What is done with the withdrawn proposals: exported like the others, or
+# left out of the proposals without being parsed
+WITHDRAWN_MODES = ["keep", "skip"]
+# Rows of the assessments CSV loaded at once
+ASSESSMENTS_CHUNK_SIZE = 10000
+# Assessments columns with few distinct values, loaded as categories
+ASSESSMENTS_CATEGORY_COLS = ["Assessor", "Result"]
+# Upper bounds in seconds of the requests latency histogram buckets
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+# Query parameters never used as part of the responses cache keys
+CACHE_EXCLUDED_PARAMS = ["api_token", "token"]
+# Formats that proposals and reviews can be saved in, besides JSON
+OUTPUT_FORMATS = ["ndjson", "parquet", "arrow"]
+# Rows written at once to Parquet and Arrow files
+TABLE_BATCH_SIZE = 10000
+# Arrow type of each export type, lists and dicts are saved as JSON strings
+ARROW_TYPES = {
+    "int": "int64",
+    "float": "float64",
+    "bool": "bool_",
+    "list": "string",
+    "dict": "string",
+}
 THEME_CUSTOM_KEY = "f11_themes"
+# Words of the synthetic funds texts, see generate_fund
+SYNTHETIC_WORDS = (
+    "cardano catalyst proposal community developer ecosystem wallet dapp "
+    "governance funding milestone budget team open source tooling onboarding "
+    "education stake pool identity oracle bridge plutus marlowe metadata "
+    "token nft defi research audit security documentation adoption impact"
+).split()
+SYNTHETIC_THEMES = ["DeFi", "Governance", "NFT", "Identity", "Education"]
+SYNTHETIC_RESULTS = ["Good", "Excellent", "Filtered Out"]
+# Rate of the mapped custom fields filled in each synthetic idea
+SYNTHETIC_FIELDS_RATE = 0.7
 
 def options_validation(ctx: typer.Context, value: bool):
     """
@@ -31,6 +100,46 @@ def options_validation(ctx: typer.Context, value: bool):
     return value
 
 
+def output_formats_validation(value: List[str]):
+    """
+    Validate the additional output formats, Parquet and Arrow need the
+    optional `pyarrow` package.
+    """
+    for output_format in value:
+        if output_format not in OUTPUT_FORMATS:
+            raise typer.BadParameter(
+                f"{output_format} is not one of {', '.join(OUTPUT_FORMATS)}"
+            )
+        if output_format in ["parquet", "arrow"]:
+            import_pyarrow()
+    return value
+
+
+def engine_validation(value: str):
+    """
+    Validate the engine, the async one needs the optional `httpx` package.
+    """
+    if value not in ENGINES:
+        raise typer.BadParameter(f"{value} is not one of {', '.join(ENGINES)}")
+    if value == "async":
+        import_httpx()
+    return value
+
+
+def json_format_validation(value: str):
+    if value not in JSON_FORMATS:
+        raise typer.BadParameter(f"{value} is not one of {', '.join(JSON_FORMATS)}")
+    return value
+
+
+def withdrawn_mode_validation(value: str):
+    if value not in WITHDRAWN_MODES:
+        raise typer.BadParameter(
+            f"{value} is not one of {', '.join(WITHDRAWN_MODES)}"
+        )
+    return value
+
+
 @app.command()
 def import_fund(
     ideascale_url: str = typer.Option(IDEASCALE_URL, help="Base URL for Ideascale API. e.g. "),
@@ -75,54 +184,326 @@ def import_fund(
         "templates/reviews_format.json", help="Mapping for assessments transformation."
     ),
     output_dir: str = typer.Option("meta/fund", help="Output dir for results"),
+    concurrency: int = typer.Option(
+        1, help="Number of concurrent requests used to fetch proposals pages"
+    ),
+    pool_size: int = typer.Option(
+        10, help="Number of keep-alive connections kept open to Ideascale"
+    ),
+    cache: bool = typer.Option(
+        False, help="Cache Ideascale responses on disk inside the output dir"
+    ),
+    cache_ttl: int = typer.Option(
+        3600, help="Seconds a cached response is used without revalidation"
+    ),
+    cache_max_size: int = typer.Option(
+        512, help="Maximum size of the responses cache in MB"
+    ),
+    offline: bool = typer.Option(
+        False, help="Replay Ideascale responses from the cache only"
+    ),
+    resume: bool = typer.Option(
+        False, help="Resume an interrupted import from its last fetched page"
+    ),
+    parse_workers: int = typer.Option(
+        1, help="Number of processes used to parse proposals"
+    ),
+    metrics: bool = typer.Option(
+        False, help="Save timings and requests metrics in the output dir"
+    ),
+    prometheus_metrics: bool = typer.Option(
+        False, help="Save metrics also in Prometheus textfile format"
+    ),
+    profile_parse: bool = typer.Option(
+        False, help="Save a cProfile dump of the proposals parsing"
+    ),
+    delta: bool = typer.Option(
+        False, help="Only parse proposals changed since the previous import"
+    ),
+    rate_limit: float = typer.Option(
+        10, help="Initial number of requests per second sent to Ideascale"
+    ),
+    max_rate_limit: float = typer.Option(
+        50, help="Maximum number of requests per second sent to Ideascale"
+    ),
+    output_formats: List[str] = typer.Option(
+        [],
+        "--output-format",
+        help="Also save proposals and reviews as ndjson, parquet or arrow",
+        callback=output_formats_validation,
+    ),
+    engine: str = typer.Option(
+        "threads",
+        help="Send requests from a pool of threads or from an asyncio event loop "
+        "(async, needs httpx)",
+        callback=engine_validation,
+    ),
+    json_format: str = typer.Option(
+        "compat",
+        help="Layout of the JSON outputs: compat (same bytes as before), "
+        "indented or compact (UTF-8, faster with orjson)",
+        callback=json_format_validation,
+    ),
+    slug_urls: str = typer.Option(
+        "", help="Project Catalyst slug URLs JSON used to rewrite proposals URLs"
+    ),
+    withdrawn_mode: str = typer.Option(
+        "keep",
+        help="Keep the withdrawn proposals in proposals.json, or skip them "
+        "without parsing them",
+        callback=withdrawn_mode_validation,
+    ),
 ):
+    authors_output = get_authors_output(merge_multiple_authors, authors_as_list)
+    if metrics or prometheus_metrics:
+        import_metrics = Metrics()
+    else:
+        import_metrics = NullMetrics()
+    profiler = None
+    if profile_parse:
+        if parse_workers > 1:
+            print("[bold red]Parsing can't be profiled with --parse-workers[/bold red]")
+        else:
+            profiler = cProfile.Profile()
+
+    templates = load_templates(
+        proposals_map,
+        extra_fields_map,
+        funds_format,
+        challenges_format,
+        proposals_format,
+        reviews_format,
+    )
+    response_cache = None
+    if cache or offline:
+        response_cache = ResponseCache(
+            f"{output_dir}/.cache", cache_ttl, cache_max_size * 1024 * 1024
+        )
+    client = get_client(
+        engine,
+        api_token,
+        max(pool_size, concurrency),
+        response_cache,
+        offline,
+        import_metrics,
+        RateLimiter(rate_limit, max_rate_limit),
+    )
+    result = run_import(
+        client,
+        templates,
+        ideascale_url=ideascale_url,
+        fund=fund,
+        fund_group_id=fund_group_id,
+        fund_campaign_id=fund_campaign_id,
+        chain_vote_type=chain_vote_type,
+        threshold=threshold,
+        authors_output=authors_output,
+        stages=stages,
+        stage_keys=stage_keys,
+        assessments=assessments,
+        withdrawn=withdrawn,
+        output_dir=output_dir,
+        concurrency=concurrency,
+        resume=resume,
+        parse_workers=parse_workers,
+        metrics=import_metrics,
+        profiler=profiler,
+        delta=delta,
+        output_formats=output_formats,
+        serializer=JsonSerializer(json_format),
+        slug_urls=slug_urls,
+        withdrawn_mode=withdrawn_mode,
+    )
+    print_client_stats(client)
+    client.close()
+    import_metrics.save(f"{output_dir}/metrics.json")
+    if prometheus_metrics:
+        import_metrics.save_prometheus(f"{output_dir}/metrics.prom")
+    if profiler is not None:
+        profiler.dump_stats(f"{output_dir}/parse.prof")
+        print(f"[cyan]Parsing profile saved in {output_dir}/parse.prof[/cyan]")
+    if len(result["failed_pages"]) > 0:
+        raise typer.Exit(code=1)
+
+
+def get_authors_output(merge_multiple_authors, authors_as_list):
     authors_output = "std"
     if authors_as_list:
         authors_output = "list"
     if merge_multiple_authors:
         authors_output = "merged_str"
+    return authors_output
 
-    proposals = []
 
-    # Load and prepare
-    proposal_mappings = json.load(open(f"{proposals_map}"))
-    extra_fields_map = json.load(open(f"{extra_fields_map}"))
-    funds_format = json.load(open(f"{funds_format}"))
-    challenges_format = json.load(open(f"{challenges_format}"))
-    proposals_format = json.load(open(f"{proposals_format}"))
-    reviews_format = json.load(open(f"{reviews_format}"))
-    if assessments:
-        assessments = transform_assessments(pd.read_csv(assessments), reviews_format)
-    else:
-        assessments = False
+def load_templates(
+    proposals_map,
+    extra_fields_map,
+    funds_format,
+    challenges_format,
+    proposals_format,
+    reviews_format,
+):
+    return {
+        "proposal_mappings": json.load(open(f"{proposals_map}")),
+        "extra_fields_map": json.load(open(f"{extra_fields_map}")),
+        "funds_format": json.load(open(f"{funds_format}")),
+        "challenges_format": json.load(open(f"{challenges_format}")),
+        "proposals_format": json.load(open(f"{proposals_format}")),
+        "reviews_format": json.load(open(f"{reviews_format}")),
+    }
 
-    scores = get_scores(assessments)
-    reviews = get_reviews(assessments, reviews_format)
-    if withdrawn != "":
-        withdrawn = pd.read_csv(withdrawn)
+
+def get_client(
+    engine, api_token, pool_size, response_cache, offline, metrics, rate_limiter
+):
+    if engine == "async":
+        client_class = AsyncIdeascaleClient
     else:
-        withdrawn = False
-    # Get local and remote data
-    themes = get_themes(ideascale_url, fund_campaign_id, api_token)
+        client_class = IdeascaleClient
+    return client_class(
+        api_token,
+        pool_size=pool_size,
+        cache=response_cache,
+        offline=offline,
+        metrics=metrics,
+        rate_limiter=rate_limiter,
+    )
+
+
+def print_client_stats(client):
+    stats = client.connection_stats()
+    print(
+        f"[cyan]Requests: {stats['requests']}, "
+        f"connections opened: {stats['connections']}, "
+        f"reused: {stats['reused']}[/cyan]"
+    )
+    print(
+        f"[cyan]Throttled: {client.rate_limiter.throttled} times, "
+        f"final rate: {client.rate_limiter.rate:.1f} requests/s[/cyan]"
+    )
+
+
+def run_import(
+    client,
+    templates,
+    ideascale_url=IDEASCALE_URL,
+    fund=8,
+    fund_group_id=1,
+    fund_campaign_id=1,
+    chain_vote_type="private",
+    threshold=450,
+    authors_output="std",
+    stages=[],
+    stage_keys=[],
+    assessments="",
+    withdrawn="",
+    output_dir="meta/fund",
+    concurrency=1,
+    resume=False,
+    parse_workers=1,
+    metrics=None,
+    profiler=None,
+    delta=False,
+    output_formats=[],
+    serializer=None,
+    slug_urls="",
+    withdrawn_mode="keep",
+):
+    """
+    Import a fund in `output_dir` with `client`, which can be shared by
+    imports running at the same time. Options are the ones of `import_fund`,
+    with the `templates` already loaded. Returns a summary of the import:
+    counts of what was saved, seconds spent and pages that couldn't be
+    fetched (the import has to be resumed when there are any).
+    """
+    start = time.time()
+    import_metrics = metrics if metrics is not None else NullMetrics()
+    proposal_mappings = templates["proposal_mappings"]
+    extra_fields_map = templates["extra_fields_map"]
+    funds_format = templates["funds_format"]
+    challenges_format = templates["challenges_format"]
+    proposals_format = templates["proposals_format"]
+    reviews_format = templates["reviews_format"]
+
+    # Load and prepare
+    print("[yellow]Preparing reviews...[/yellow]")
+    with import_metrics.timer("load"), OutputWriter(
+        f"{output_dir}/reviews",
+        reviews_format,
+        output_formats,
+        flush_every=ASSESSMENTS_CHUNK_SIZE,
+        serializer=serializer,
+    ) as reviews_writer:
+        # Reviews are saved while loading, only ratings are kept in memory
+        if assessments:
+            assessments = load_assessments(assessments, reviews_format, reviews_writer)
+        else:
+            assessments = False
+    with import_metrics.timer("score"):
+        scores = get_scores(assessments)
+        score_index = get_score_index(assessments)
+    with import_metrics.timer("load"):
+        excluded = []
+        if withdrawn != "":
+            excluded = load_withdrawn(withdrawn)
+        slug_index = None
+        if slug_urls != "":
+            slug_index = load_slug_urls(slug_urls)
+    # Get remote data
+    themes = get_themes(ideascale_url, fund_campaign_id, client)
     # OVERRIDE fund_goal to set the current time in RFC3339 format
     fund_goal = {
         "timestamp": strict_rfc3339.now_to_rfc3339_utcoffset(integer=True),
         "themes": themes,
     }
     e_fund = get_fund(fund, threshold, fund_goal)
-    challenges = get_challenges(ideascale_url, fund, fund_group_id, api_token)
+    challenges = get_challenges(ideascale_url, fund, fund_group_id, client)
+    # Proposals are parsed, exported and saved one by one as pages are fetched
+    proposals = []
+    journal = ImportJournal(f"{output_dir}/.import-journal.jsonl", resume)
+    if challenges is None:
+        # The import goes on without challenges, and fails at the end
+        challenges = []
+        journal.fail(f"{ideascale_url}/a/rest/v1/campaigns/groups/{fund_group_id}")
+    if delta:
+        delta = DeltaImport(
+            output_dir,
+            get_delta_context(
+                fund,
+                challenges,
+                proposal_mappings,
+                extra_fields_map,
+                chain_vote_type,
+                authors_output,
+                proposals_format,
+                slug_urls,
+            ),
+        )
+    else:
+        delta = None
+    skip_ids = None
+    if withdrawn_mode == "skip" and len(excluded) > 0:
+        skip_ids = set(excluded)
+        print(f"[yellow]Skipping {len(skip_ids)} withdrawn proposals...[/yellow]")
     if len(stage_keys) > 0:
         proposals = _get_proposals(
             ideascale_url,
             stage_keys,
             fund,
             challenges,
-            api_token,
+            client,
             proposal_mappings,
             extra_fields_map,
             chain_vote_type,
-            assessments,
+            score_index,
             authors_output,
+            concurrency,
+            journal,
+            parse_workers,
+            import_metrics,
+            profiler,
+            delta,
+            skip_ids,
         )
     elif len(stages) > 0:
         proposals = get_proposals(
@@ -130,36 +511,661 @@ def import_fund(
             stages,
             fund,
             challenges,
-            api_token,
+            client,
             proposal_mappings,
             extra_fields_map,
             chain_vote_type,
-            assessments,
+            score_index,
             authors_output,
+            concurrency,
+            journal,
+            parse_workers,
+            import_metrics,
+            profiler,
+            delta,
+            skip_ids,
         )
+    proposals_fields = compile_format(proposals_format)
+    unmatched_urls = []
+    with OutputWriter(
+        f"{output_dir}/proposals",
+        proposals_format,
+        output_formats,
+        serializer=serializer,
+    ) as proposals_writer:
+        for proposal in proposals:
+            with import_metrics.timer("export"):
+                if isinstance(proposal, CarriedProposal):
+                    exported = proposal
+                else:
+                    exported = proposal.export(proposals_fields)
+                if slug_index is not None:
+                    if not rewrite_proposal_url(exported, slug_index, fund):
+                        unmatched_urls.append(exported.get("proposal_id"))
+            with import_metrics.timer("save"):
+                proposals_writer.write(exported)
 
-    excluded = transform_excluded(withdrawn)
+    if delta is not None:
+        # Ideas of the pages that couldn't be fetched were not seen
+        delta.save(complete=len(journal.failed) == 0)
+    report_unmatched_urls(unmatched_urls)
 
     # Export relevant data
     print("[yellow]Saving data...[/yellow]")
-    save_json(f"{output_dir}/funds.json", export_format(e_fund, funds_format))
+    with import_metrics.timer("export"):
+        e_fund = export_format(e_fund, funds_format)
+        challenges = export_format(challenges, challenges_format)
+    with import_metrics.timer("save"):
+        save_json(f"{output_dir}/funds.json", e_fund, serializer)
+        save_json(f"{output_dir}/challenges.json", challenges, serializer)
+        save_scores(f"{output_dir}/scores.csv", scores)
+        save_json(f"{output_dir}/excluded_proposals.json", excluded, serializer)
+    print(f"[green bold]All data saved in {output_dir}.[/green bold]")
+    failed_pages = list(journal.failed)
+    if len(failed_pages) > 0:
+        journal.close()
+        print(f"[bold red]Unable to fetch {len(failed_pages)} pages:[/bold red]")
+        for url in failed_pages:
+            print(f"[red]{url}[/red]")
+        print("[bold red]Proposals are incomplete, run again with --resume[/bold red]")
+    else:
+        journal.close(remove=True)
+    return {
+        "fund": fund,
+        "output_dir": output_dir,
+        "seconds": round(time.time() - start, 3),
+        "challenges": len(challenges),
+        "proposals": proposals_writer.count,
+        "reviews": reviews_writer.count,
+        "excluded": len(excluded),
+        "unmatched_urls": unmatched_urls,
+        "failed_pages": failed_pages,
+    }
+
+
+# Keys of each fund of an `import-batch` manifest, and the optional ones
+BATCH_FUND_KEYS = ["fund", "fund_group_id", "fund_campaign_id", "output_dir"]
+BATCH_FUND_OPTIONS = [
+    "stages",
+    "stage_keys",
+    "assessments",
+    "withdrawn",
+    "chain_vote_type",
+    "threshold",
+    "slug_urls",
+]
+
+
+def load_batch_manifest(path):
+    """
+    Load the funds of an `import-batch` manifest: a JSON list of objects
+    with the `BATCH_FUND_KEYS`, `stages` or `stage_keys` and, optionally,
+    the other `BATCH_FUND_OPTIONS` of `import_fund` for that fund.
+    """
+    funds = json.load(open(path))
+    for n, fund in enumerate(funds):
+        missing = [k for k in BATCH_FUND_KEYS if k not in fund]
+        if "stages" not in fund and "stage_keys" not in fund:
+            missing.append("stages or stage_keys")
+        unknown = [k for k in fund if k not in BATCH_FUND_KEYS + BATCH_FUND_OPTIONS]
+        if len(missing) > 0 or len(unknown) > 0:
+            raise typer.BadParameter(
+                f"fund {n} of {path}: missing {missing}, unknown {unknown}"
+            )
+    return funds
+
+
+@app.command()
+def import_batch(
+    manifest: str = typer.Option(
+        "batch.json", help="JSON list of the funds to import, see the README"
+    ),
+    summary: str = typer.Option(
+        "batch-summary.json", help="File where the summary of the imports is saved"
+    ),
+    fund_concurrency: int = typer.Option(2, help="Number of funds imported at once"),
+    ideascale_url: str = typer.Option(IDEASCALE_URL, help="Base URL for Ideascale API. e.g. "),
+    api_token: str = typer.Option("", help="Ideascale API token."),
+    chain_vote_type: str = typer.Option("private", help="Default chain vote type"),
+    threshold: int = typer.Option(450, help="Default voting threshold"),
+    merge_multiple_authors: bool = typer.Option(
+        False, help="When active includes and merge contributors name in author field"
+    ),
+    authors_as_list: bool = typer.Option(
+        False,
+        help="Export authors as a list of objects in place of an author field",
+        callback=options_validation,
+    ),
+    proposals_map: str = typer.Option(
+        "templates/proposals_map.json", help="Mapping for proposals"
+    ),
+    extra_fields_map: str = typer.Option(
+        "templates/proposals_extra_fields.json", help="Mappings for extra fields"
+    ),
+    funds_format: str = typer.Option(
+        "templates/funds_format.json", help="Mapping for funds transformation."
+    ),
+    challenges_format: str = typer.Option(
+        "templates/challenges_format.json", help="Mapping for challenges export."
+    ),
+    proposals_format: str = typer.Option(
+        "templates/proposals_format.json", help="Mapping for proposals"
+    ),
+    reviews_format: str = typer.Option(
+        "templates/reviews_format.json", help="Mapping for assessments transformation."
+    ),
+    concurrency: int = typer.Option(
+        1, help="Number of concurrent requests used to fetch the pages of each fund"
+    ),
+    pool_size: int = typer.Option(
+        10, help="Number of keep-alive connections kept open to Ideascale, shared"
+    ),
+    cache_dir: str = typer.Option(
+        "", help="Cache Ideascale responses on disk in this dir, shared by the funds"
+    ),
+    cache_ttl: int = typer.Option(
+        3600, help="Seconds a cached response is used without revalidation"
+    ),
+    cache_max_size: int = typer.Option(
+        512, help="Maximum size of the responses cache in MB"
+    ),
+    offline: bool = typer.Option(
+        False, help="Replay Ideascale responses from the cache only"
+    ),
+    resume: bool = typer.Option(
+        False, help="Resume interrupted imports from their last fetched page"
+    ),
+    parse_workers: int = typer.Option(
+        1, help="Number of processes used to parse the proposals of each fund"
+    ),
+    delta: bool = typer.Option(
+        False, help="Only parse proposals changed since the previous import"
+    ),
+    rate_limit: float = typer.Option(
+        10, help="Initial number of requests per second sent to Ideascale"
+    ),
+    max_rate_limit: float = typer.Option(
+        50, help="Maximum number of requests per second sent to Ideascale"
+    ),
+    output_formats: List[str] = typer.Option(
+        [],
+        "--output-format",
+        help="Also save proposals and reviews as ndjson, parquet or arrow",
+        callback=output_formats_validation,
+    ),
+    engine: str = typer.Option(
+        "threads",
+        help="Send requests from a pool of threads or from an asyncio event loop "
+        "(async, needs httpx)",
+        callback=engine_validation,
+    ),
+    json_format: str = typer.Option(
+        "compat",
+        help="Layout of the JSON outputs: compat (same bytes as before), "
+        "indented or compact (UTF-8, faster with orjson)",
+        callback=json_format_validation,
+    ),
+    withdrawn_mode: str = typer.Option(
+        "keep",
+        help="Keep the withdrawn proposals in proposals.json, or skip them "
+        "without parsing them",
+        callback=withdrawn_mode_validation,
+    ),
+):
+    """
+    Import the funds listed in a manifest, `--fund-concurrency` at a time.
+    All the imports share one client: the pool of connections, the responses
+    cache and the rate limit are a budget for the whole batch.
+    """
+    funds = load_batch_manifest(manifest)
+    authors_output = get_authors_output(merge_multiple_authors, authors_as_list)
+    templates = load_templates(
+        proposals_map,
+        extra_fields_map,
+        funds_format,
+        challenges_format,
+        proposals_format,
+        reviews_format,
+    )
+    response_cache = None
+    if cache_dir or offline:
+        response_cache = ResponseCache(
+            cache_dir or ".cache", cache_ttl, cache_max_size * 1024 * 1024
+        )
+    client = get_client(
+        engine,
+        api_token,
+        max(pool_size, concurrency),
+        response_cache,
+        offline,
+        NullMetrics(),
+        RateLimiter(rate_limit, max_rate_limit),
+    )
+
+    def import_one(fund):
+        os.makedirs(fund["output_dir"], exist_ok=True)
+        return run_import(
+            client,
+            templates,
+            ideascale_url=ideascale_url,
+            fund=fund["fund"],
+            fund_group_id=fund["fund_group_id"],
+            fund_campaign_id=fund["fund_campaign_id"],
+            chain_vote_type=fund.get("chain_vote_type", chain_vote_type),
+            threshold=fund.get("threshold", threshold),
+            authors_output=authors_output,
+            stages=fund.get("stages", []),
+            stage_keys=fund.get("stage_keys", []),
+            assessments=fund.get("assessments", ""),
+            withdrawn=fund.get("withdrawn", ""),
+            output_dir=fund["output_dir"],
+            concurrency=concurrency,
+            resume=resume,
+            parse_workers=parse_workers,
+            delta=delta,
+            output_formats=output_formats,
+            serializer=JsonSerializer(json_format),
+            slug_urls=fund.get("slug_urls", ""),
+            withdrawn_mode=withdrawn_mode,
+        )
+
+    start = time.time()
+    results = []
+    with ThreadPoolExecutor(max_workers=fund_concurrency) as executor:
+        futures = [executor.submit(import_one, fund) for fund in funds]
+        for fund, future in zip(funds, futures):
+            try:
+                result = future.result()
+                result["status"] = "ok"
+                if len(result["failed_pages"]) > 0:
+                    result["status"] = "failed"
+            except Exception as e:
+                print(f"[bold red]Import of fund {fund['fund']} failed: {e}[/bold red]")
+                result = {
+                    "fund": fund["fund"],
+                    "output_dir": fund["output_dir"],
+                    "status": "error",
+                    "error": repr(e),
+                }
+            results.append(result)
+    print_client_stats(client)
+    stats = client.connection_stats()
+    client.close()
     save_json(
-        f"{output_dir}/challenges.json", export_format(challenges, challenges_format)
+        summary,
+        {
+            "seconds": round(time.time() - start, 3),
+            "requests": stats["requests"],
+            "throttled": client.rate_limiter.throttled,
+            "funds": results,
+        },
+    )
+    print(f"[green bold]Summary of {len(funds)} imports saved in {summary}[/green bold]")
+    if any(result["status"] != "ok" for result in results):
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def rewrite_urls(
+    proposals: str = typer.Option("proposals.json", help="Proposals JSON file"),
+    slug_urls: str = typer.Option(
+        "slug-urls.json", help="Project Catalyst slug URLs JSON"
+    ),
+    output: str = typer.Option(
+        "proposals-slugs.json", help="File where rewritten proposals are saved"
+    ),
+    fund: int = typer.Option(10, help="Fund number used in the URLs"),
+    json_format: str = typer.Option(
+        "compat",
+        help="Layout of the JSON output: compat, indented or compact",
+        callback=json_format_validation,
+    ),
+):
+    """
+    Rewrite the `proposal_url` of already imported proposals with their
+    Project Catalyst URL (same as `import-fund --slug-urls`).
+    """
+    slug_index = load_slug_urls(slug_urls)
+    with open(proposals) as proposals_file:
+        all_proposals = json.load(proposals_file)
+    unmatched = []
+    with JsonArrayWriter(output, serializer=JsonSerializer(json_format)) as writer:
+        for proposal in all_proposals:
+            if not rewrite_proposal_url(proposal, slug_index, fund):
+                unmatched.append(proposal.get("proposal_id"))
+            writer.write(proposal)
+    report_unmatched_urls(unmatched)
+    print(f"[green bold]{len(all_proposals)} proposals saved in {output}[/green bold]")
+
+
+def load_slug_urls(path):
+    # Projects of the slug URLs export, indexed by proposal id (`_id`)
+    with open(path) as urls_file:
+        urls = json.load(urls_file)
+    return {row["_id"]: row for row in urls["data"]["fund"]["projects"]}
+
+
+def rewrite_proposal_url(proposal, slug_index, fund):
+    # Returns False when there's no slug URL for the proposal
+    row = slug_index.get(proposal.get("proposal_id"))
+    if row is None:
+        return False
+    proposal["proposal_url"] = (
+        f"{PROJECT_CATALYST_URL}/funds/{fund}/"
+        f"{row['challenge']['slug']}/{row['projectSlug']}"
+    )
+    return True
+
+
+def report_unmatched_urls(unmatched):
+    if len(unmatched) > 0:
+        ids = ", ".join(str(proposal_id) for proposal_id in unmatched)
+        print(f"[bold red]No slug URL for {len(unmatched)} proposals:[/bold red]")
+        print(f"[red]{ids}[/red]")
+
+
+@app.command()
+def generate_fund(
+    output_dir: str = typer.Option(
+        "meta/synthetic", help="Output dir for the synthetic fund"
+    ),
+    fund: int = typer.Option(11, help="Fund number."),
+    ideas: int = typer.Option(1000, help="Number of ideas"),
+    challenges: int = typer.Option(30, help="Number of challenges (campaigns)"),
+    stages: List[int] = typer.Option(
+        [4700, 4701], help="List of stages (funnel) ids the ideas are spread on"
+    ),
+    reviews_per_idea: int = typer.Option(5, help="Maximum number of reviews per idea"),
+    withdrawn_rate: float = typer.Option(0.02, help="Rate of withdrawn ideas"),
+    page_size: int = typer.Option(50, help="Number of ideas in each page"),
+    text_pool_size: int = typer.Option(
+        500, help="Number of text fragments the texts are made of"
+    ),
+    proposals_map: str = typer.Option(
+        "templates/proposals_map.json", help="Mapping for proposals"
+    ),
+    extra_fields_map: str = typer.Option(
+        "templates/proposals_extra_fields.json", help="Mappings for extra fields"
+    ),
+    seed: int = typer.Option(42, help="Seed of the random generator"),
+):
+    """
+    Generate a synthetic fund, for load tests: the IdeaScale responses
+    (challenges, custom fields and ideas pages by stage) and the assessments
+    and withdrawn CSV files. The same seed always gives the same fund.
+    """
+    start = time.time()
+    os.makedirs(output_dir, exist_ok=True)
+    synthetic = generate_synthetic_fund(
+        ideas,
+        challenges,
+        stages,
+        fund=fund,
+        keys=synthetic_custom_keys(
+            json.load(open(proposals_map)), json.load(open(extra_fields_map))
+        ),
+        reviews_per_idea=reviews_per_idea,
+        withdrawn_rate=withdrawn_rate,
+        text_pool_size=text_pool_size,
+        seed=seed,
     )
+    serializer = JsonSerializer("compact")
+    save_json(f"{output_dir}/challenges.json", synthetic["groups"], serializer)
     save_json(
-        f"{output_dir}/proposals.json", export_format(proposals, proposals_format)
+        f"{output_dir}/custom_fields.json", synthetic["custom_fields"], serializer
     )
-    save_json(f"{output_dir}/reviews.json", export_format(reviews, reviews_format))
-    scores.to_csv(f"{output_dir}/scores.csv", index=False)
-    save_json(f"{output_dir}/excluded_proposals.json", excluded)
-    print(f"[green bold]All data saved in {output_dir}.[/green bold]")
+    pages = 0
+    for stage, stage_ideas in synthetic["ideas_by_stage"].items():
+        stage_dir = f"{output_dir}/ideas/{stage}"
+        os.makedirs(stage_dir, exist_ok=True)
+        for page, offset in enumerate(range(0, len(stage_ideas), page_size)):
+            page_ideas = stage_ideas[offset : offset + page_size]
+            save_json(f"{stage_dir}/{page}.json", page_ideas, serializer)
+            pages = pages + 1
+    save_csv(f"{output_dir}/assessments.csv", synthetic["assessments"])
+    save_csv(f"{output_dir}/withdrawn.csv", synthetic["withdrawn"])
+    print(
+        f"[green bold]{ideas} ideas ({pages} pages), "
+        f"{len(synthetic['assessments'])} assessments and "
+        f"{len(synthetic['withdrawn'])} withdrawn proposals saved in {output_dir} "
+        f"in {round(time.time() - start, 2)}s[/green bold]"
+    )
+
+
+def synthetic_custom_keys(proposal_mappings, extra_fields_map):
+    # Custom fields read by the mappings, filled at random in the ideas
+    keys = []
+    for mapping in [proposal_mappings, extra_fields_map]:
+        for value in mapping.values():
+            keys.extend(value if isinstance(value, list) else [value])
+    return list(dict.fromkeys(keys))
+
+
+def synthetic_text_pool(rng, size, html=True):
+    """
+    Fragments of 5 to 60 words, all sampled at once. With `html` 4 out of 5
+    fragments are wrapped in the markup IdeaScale returns.
+    """
+    import numpy as np
+
+    words = np.array(SYNTHETIC_WORDS)
+    lengths = rng.integers(5, 60, size=size, endpoint=True)
+    sampled = words[rng.integers(0, len(words), size=int(lengths.sum()))]
+    pool = []
+    for n, fragment in enumerate(np.split(sampled, np.cumsum(lengths)[:-1])):
+        text = " ".join(fragment.tolist())
+        kind = n % 5 if html else 0
+        if kind == 1:
+            text = f"<p>{text}</p>"
+        elif kind == 2:
+            text = f"<p><b>{text[:20]}</b> {text}</p>\r\n<p>{text}</p>"
+        elif kind == 3:
+            text = f"<ul><li>{text}</li><li>{text[::-1]}</li></ul>"
+        elif kind == 4:
+            text = f'<p>{text} <a href="https://example.com/{n}">link</a></p>'
+        pool.append(text)
+    return pool
+
+
+def generate_synthetic_fund(
+    n_ideas,
+    n_challenges,
+    stage_ids,
+    fund=11,
+    keys=(),
+    reviews_per_idea=5,
+    withdrawn_rate=0.02,
+    text_pool_size=500,
+    seed=42,
+):
+    """
+    Sample a synthetic fund with NumPy, drawing every random value of a kind
+    at once, and return its IdeaScale responses (`groups`, `custom_fields`,
+    `ideas_by_stage`), its `ideas` and the `assessments` and `withdrawn`
+    data frames.
+
+    Texts are taken from pools of fragments, each idea text is made unique
+    by its id like real texts.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    pool = synthetic_text_pool(rng, text_pool_size)
+    notes = synthetic_text_pool(rng, text_pool_size, html=False)
+    words = np.array(SYNTHETIC_WORDS)
+
+    campaign_ids = (1000 + np.arange(n_challenges)).tolist()
+    campaign_names = [f"F{fund}: Challenge {n}" for n in range(n_challenges)]
+    rewards = rng.integers(1, 20, size=n_challenges, endpoint=True).tolist()
+    descriptions = rng.integers(0, len(pool), size=n_challenges).tolist()
+    campaigns = [
+        {
+            "id": campaign_ids[n],
+            "name": campaign_names[n],
+            "tagline": f"₳{rewards[n]},000,000 ada",
+            "description": pool[descriptions[n]],
+        }
+        for n in range(n_challenges)
+    ]
+    themes = "\r\n".join(SYNTHETIC_THEMES)
+    custom_fields = [{"key": THEME_CUSTOM_KEY, "options": themes}]
+
+    ids = (100000 + np.arange(n_ideas)).tolist()
+    idea_campaigns = rng.integers(0, n_challenges, size=n_ideas).tolist()
+    idea_stages = rng.integers(0, len(stage_ids), size=n_ideas).tolist()
+    titles = words[rng.integers(0, len(words), size=(n_ideas, 6))].tolist()
+    texts = rng.integers(0, len(pool), size=n_ideas).tolist()
+    contributors = rng.integers(0, 3, size=n_ideas, endpoint=True).tolist()
+    keys = [k for k in keys if k not in ("f11_requested_funds", "auto_translated")]
+    filled = (rng.random((n_ideas, len(keys))) < SYNTHETIC_FIELDS_RATE).tolist()
+    fields = rng.integers(0, len(pool), size=(n_ideas, len(keys))).tolist()
+    requested_funds = (rng.integers(5, 500, size=n_ideas) * 1000).tolist()
+    translated = (rng.random(n_ideas) < 0.5).tolist()
+    open_source = (rng.random(n_ideas) < 0.5).tolist()
+    idea_themes = (rng.random((n_ideas, len(SYNTHETIC_THEMES))) < 0.4).tolist()
+
+    ideas = []
+    ideas_by_stage = {stage: [] for stage in stage_ids}
+    for n in range(n_ideas):
+        idea_id = ids[n]
+        idea_custom_fields = {
+            key: f"{pool[field]} ({idea_id})"
+            for key, field, is_filled in zip(keys, fields[n], filled[n])
+            if is_filled
+        }
+        idea_custom_fields.update(
+            {
+                "f11_requested_funds": str(requested_funds[n]),
+                "auto_translated": "Yes" if translated[n] else "No",
+                "f11_open_source_choice": "Yes" if open_source[n] else "No",
+                "f11_link_1": f"https://github.com/example/{idea_id}",
+                "f11_link_2": "",
+                "f11_link_3": "",
+                THEME_CUSTOM_KEY: "\r\n".join(
+                    theme
+                    for theme, is_theme in zip(SYNTHETIC_THEMES, idea_themes[n])
+                    if is_theme
+                ),
+            }
+        )
+        idea = {
+            "id": idea_id,
+            "campaignId": campaign_ids[idea_campaigns[n]],
+            "stageId": stage_ids[idea_stages[n]],
+            "title": " ".join(titles[n]),
+            "text": f"{pool[texts[n]]} ({idea_id})",
+            "url": f"{IDEASCALE_URL}/a/dtd/{idea_id}-48088",
+            "authorInfo": {"name": f"Proposer {idea_id}"},
+            "contributors": [
+                {"name": f"Contributor {idea_id}-{c}"} for c in range(contributors[n])
+            ],
+            "customFieldsByKey": idea_custom_fields,
+        }
+        ideas.append(idea)
+        ideas_by_stage[idea["stageId"]].append(idea)
+
+    # Assessments, one row for each review of each idea
+    reviews = rng.integers(1, max(reviews_per_idea, 1), size=n_ideas, endpoint=True)
+    reviewed = np.repeat(np.arange(n_ideas), reviews)
+    n_reviews = len(reviewed)
+    ideas_ids = np.array(ids, dtype=np.int64)
+    ideas_titles = np.array([idea["title"] for idea in ideas], dtype=object)
+    ideas_urls = np.array([idea["url"] for idea in ideas], dtype=object)
+    ideas_campaigns = np.array(idea_campaigns, dtype=np.int64)
+    names = np.array(campaign_names, dtype=object)
+    assessors = "z_assessor_" + pd.Series(
+        rng.integers(5000, 7000, size=n_reviews)
+    ).astype(str)
+    assessments = pd.DataFrame(
+        {
+            "id": np.arange(1, n_reviews + 1),
+            "Challenge": names[ideas_campaigns[reviewed]],
+            "Idea Title": ideas_titles[reviewed],
+            "Idea URL": ideas_urls[reviewed],
+            "Assessor": assessors,
+            "triplet_id": assessors + "-" + pd.Series(ideas_ids[reviewed]).astype(str),
+            "proposal_id": ideas_ids[reviewed],
+            "challenge_id": np.array(campaign_ids, dtype=np.int64)[
+                ideas_campaigns[reviewed]
+            ],
+        }
+    )
+    notes = np.array(notes, dtype=object)
+    ratings = np.zeros(n_reviews)
+    for criteria in ["Impact / Alignment", "Feasibility", "Auditability"]:
+        rating = rng.integers(1, 5, size=n_reviews, endpoint=True)
+        assessments[f"{criteria} Note"] = notes[
+            rng.integers(0, len(notes), size=n_reviews)
+        ]
+        assessments[f"{criteria} Rating"] = rating
+        ratings += rating
+    assessments["Result"] = np.array(SYNTHETIC_RESULTS, dtype=object)[
+        rng.integers(0, len(SYNTHETIC_RESULTS), size=n_reviews)
+    ]
+
+    # Withdrawn proposals, with their average rating
+    withdrawn = np.flatnonzero(rng.random(n_ideas) < withdrawn_rate)
+    ideas_ratings = np.bincount(reviewed, weights=ratings / 3, minlength=n_ideas)
+    ideas_ratings = ideas_ratings / np.maximum(reviews, 1)
+    withdrawn_proposals = pd.DataFrame(
+        {
+            "Idea Title": ideas_titles[withdrawn],
+            "proposal_id": ideas_ids[withdrawn],
+            "Challenge": names[ideas_campaigns[withdrawn]],
+            "Rating Given": ideas_ratings[withdrawn].round(2),
+            "No. Assessments": reviews[withdrawn],
+            "active": "FALSE",
+        }
+    )
+    return {
+        "groups": [{"campaigns": campaigns}],
+        "custom_fields": custom_fields,
+        "ideas": ideas,
+        "ideas_by_stage": ideas_by_stage,
+        "assessments": assessments,
+        "withdrawn": withdrawn_proposals,
+    }
+
+
+def save_csv(path, frame):
+    """
+    Save `frame` as `to_csv(index=False)` does for columns of texts, numbers
+    and booleans like the synthetic ones, faster on texts repeated across
+    rows: each distinct text is quoted once. Missing values are empty fields.
+    """
+    import numpy as np
+    import pandas as pd
+
+    columns = []
+    for name in frame.columns:
+        column = frame[name]
+        if column.dtype == object:
+            # Missing values have the code -1, the last field
+            codes, uniques = pd.factorize(column)
+            fields = np.array([csv_field(v) for v in uniques] + [""], dtype=object)
+            columns.append(fields[codes].tolist())
+        else:
+            fields = np.where(column.isna(), "", column.astype(str))
+            columns.append(fields.tolist())
+    with open(path, "w", encoding="utf-8") as outfile:
+        outfile.write(",".join(csv_field(name) for name in frame.columns) + "\n")
+        outfile.writelines(",".join(row) + "\n" for row in zip(*columns))
+
+
+def csv_field(value):
+    # Quoted as by to_csv, whose lines end with "\n" only
+    value = str(value)
+    if any(c in value for c in ',"\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
 
 
-def get_themes(ideascale_url,fund_campaign_id, api_token):
+def get_themes(ideascale_url, fund_campaign_id, client):
     print("[yellow]Requesting themes...[/yellow]")
     themes = None
     url = f"{ideascale_url}/a/rest/v1/customFields/idea/campaigns/{fund_campaign_id}"
-    response = ideascale_get(url, api_token)
+    response = client.get(url)
     if response is not None:
         theme_data = [d for d in response if d.get("key") == THEME_CUSTOM_KEY]
         if len(theme_data) > 0:
@@ -177,10 +1183,10 @@ def get_fund(fund_id, threshold, goal):
     return [{"id": fund_id, "goal": goal, "threshold": threshold, "rewards_info": ""}]
 
 
-def get_challenges(ideascale_url, fund_id, fund_group_id, api_token):
+def get_challenges(ideascale_url, fund_id, fund_group_id, client):
     print("[yellow]Requesting challenges...[/yellow]")
     url = f"{ideascale_url}/a/rest/v1/campaigns/groups/{fund_group_id}"
-    response = ideascale_get(url, api_token)
+    response = client.get(url)
     if response is not None:
         challenges = []
         for fund in response:
@@ -216,51 +1222,57 @@ def _get_proposals(
     stage_ids,
     fund_id,
     challenges,
-    api_token,
+    client,
     proposal_mappings,
     extra_fields_map,
     chain_vote_type,
-    assessments,
+    score_index,
     authors_output,
+    concurrency=1,
+    journal=None,
+    parse_workers=1,
+    metrics=None,
+    profiler=None,
+    delta=None,
+    skip_ids=None,
 ):
     print("[yellow]Requesting proposals...[/yellow]")
     page_size = 50
-    ideas = []
-    relevant_keys = extract_relevant_keys(proposal_mappings)
-    relevant_extra_keys = extract_relevant_keys(extra_fields_map)
-    internal_id = 0
+    context = get_parse_context(
+        fund_id,
+        challenges,
+        proposal_mappings,
+        extra_fields_map,
+        chain_vote_type,
+        score_index,
+        authors_output,
+    )
+    # One stream of pages for each challenge and stage, in this order
+    streams = []
+    streams_challenges = []
     for challenge in challenges:
         c_id = challenge["internal_id"]
         for stage in stage_ids:
             url_prefix = f"{ideascale_url}/a/rest/v1/campaigns/{c_id}/ideas/status/custom"
-            for page in range(MAX_PAGES_TO_QUERY):
-                url = f"{url_prefix}/{stage}/{page}/{page_size}"
-                response = ideascale_get(url, api_token)
-                if response is not None:
-                    for idea in response:
-                        parsed_idea = parse_idea(
-                            idea,
-                            fund_id,
-                            relevant_keys,
-                            relevant_extra_keys,
-                            extra_fields_map,
-                            challenge,
-                            chain_vote_type,
-                            internal_id,
-                            assessments,
-                            authors_output,
-                            proposal_mappings,
-                        )
-                        ideas.append(parsed_idea)
-                        internal_id = internal_id + 1
-                    if len(response) < page_size:
-                        # Break page loop if there are no results - thanks IdeaScale
-                        # pagination implementation
-                        break
-                else:
-                    print(f"[bold red]Unable to fetch ideas from {url}[/bold red]")
-    print(f"[bold green]Total ideas pulled: {len(ideas)}[/bold green]")
-    return ideas
+            streams.append(f"{url_prefix}/{stage}")
+            streams_challenges.append(challenge)
+    pages = fetch_pages(streams, page_size, client, concurrency, journal)
+
+    def ideas_pages():
+        for stream, url, response in pages:
+            if response is not None:
+                yield response, streams_challenges[stream]
+            else:
+                print(f"[bold red]Unable to fetch ideas from {url}[/bold red]")
+
+    total = 0
+    parsed_ideas = parse_pages(
+        ideas_pages(), context, parse_workers, metrics, profiler, delta, skip_ids
+    )
+    for parsed_idea in parsed_ideas:
+        yield parsed_idea
+        total = total + 1
+    print(f"[bold green]Total ideas pulled: {total}[/bold green]")
 
 
 def get_proposals(
@@ -268,116 +1280,521 @@ def get_proposals(
     stage_ids,
     fund_id,
     challenges,
-    api_token,
+    client,
     proposal_mappings,
     extra_fields_map,
     chain_vote_type,
-    assessments,
+    score_index,
     authors_output,
+    concurrency=1,
+    journal=None,
+    parse_workers=1,
+    metrics=None,
+    profiler=None,
+    delta=None,
+    skip_ids=None,
 ):
     print("[yellow]Requesting proposals...[/yellow]")
     page_size = 50
-    ideas = []
-    relevant_keys = extract_relevant_keys(proposal_mappings)
-    relevant_extra_keys = extract_relevant_keys(extra_fields_map)
-    internal_id = 0
-    for stage in stage_ids:
-        for page in range(MAX_PAGES_TO_QUERY):
-            url = f"{ideascale_url}/a/rest/v1/stages/{stage}/ideas/{page}/{page_size}"
-            response = ideascale_get(url, api_token)
+    context = get_parse_context(
+        fund_id,
+        challenges,
+        proposal_mappings,
+        extra_fields_map,
+        chain_vote_type,
+        score_index,
+        authors_output,
+    )
+    streams = [f"{ideascale_url}/a/rest/v1/stages/{stage}/ideas" for stage in stage_ids]
+    pages = fetch_pages(streams, page_size, client, concurrency, journal)
+
+    def ideas_pages():
+        for stream, url, response in pages:
             if response is not None:
-                for idea in response:
-                    challenge = find_challenge(idea["campaignId"], challenges)
-                    parsed_idea = parse_idea(
-                        idea,
-                        fund_id,
-                        relevant_keys,
-                        relevant_extra_keys,
-                        extra_fields_map,
-                        challenge,
-                        chain_vote_type,
-                        internal_id,
-                        assessments,
-                        authors_output,
-                        proposal_mappings,
-                    )
-                    ideas.append(parsed_idea)
-                    internal_id = internal_id + 1
-                if len(response) < page_size:
-                    # Break page loop if there are no results - thanks IdeaScale
-                    # pagination implementation
-                    break
+                # Challenges are found from each idea campaign
+                yield response, None
             else:
                 print(f"[bold red]Unable to fetch proposals from {url}[/bold red]")
-    print(f"[bold green]Total ideas pulled: {len(ideas)}[/bold green]")
-    return ideas
 
+    total = 0
+    parsed_ideas = parse_pages(
+        ideas_pages(), context, parse_workers, metrics, profiler, delta, skip_ids
+    )
+    for parsed_idea in parsed_ideas:
+        yield parsed_idea
+        total = total + 1
+    print(f"[bold green]Total ideas pulled: {total}[/bold green]")
 
-def parse_idea(
-    idea,
+
+def get_parse_context(
     fund_id,
-    relevant_keys,
-    relevant_extra_keys,
+    challenges,
+    proposal_mappings,
     extra_fields_map,
-    challenge,
     chain_vote_type,
-    internal_id,
-    assessments,
+    score_index,
     authors_output,
-    proposal_mappings,
 ):
-    temp_idea = extract_custom_fields(idea, relevant_keys)
-    extra_fields_idea = extract_custom_fields(idea, relevant_extra_keys)
-    parsed_idea = {
-        "category_name": f"Fund {fund_id}",
-        "chain_vote_options": "blank,yes,no",
-        "challenge_id": challenge["id"],
-        "challenge_type": challenge["challenge_type"],
+    # Arguments of parse_idea shared by all the ideas of an import
+    return {
+        "fund_id": fund_id,
+        "challenge_index": index_challenges(challenges),
+        "mapping_plan": compile_mappings(proposal_mappings, extra_fields_map),
         "chain_vote_type": chain_vote_type,
-        "internal_id": internal_id,
-        "proposal_id": idea["id"],
-        "proposal_impact_score": extract_score(idea["id"], assessments),
-        "proposal_summary": strip_tags(idea["text"]),
-        "proposal_title": strip_tags(idea["title"]),
-        "proposal_url": idea["url"],
-        "files_url": {
-            "open_source": idea["customFieldsByKey"]["f11_open_source_choice"],
-            "external_link1": idea["customFieldsByKey"]["f11_link_1"],
-            "external_link2": idea["customFieldsByKey"]["f11_link_2"],
-            "external_link3": idea["customFieldsByKey"]["f11_link_3"],
-            "themes": idea["customFieldsByKey"][THEME_CUSTOM_KEY],
-        },
+        "score_index": score_index,
+        "authors_output": authors_output,
     }
-    if authors_output == "std" or authors_output == "merged_str":
-        proposers_name = extract_proposers(idea, authors_output)
-        # parsed_idea['proposer_email'] = idea["authorInfo"]["email"]
-        parsed_idea["proposer_name"] = proposers_name
-    else:
-        proposers = extract_proposers(idea, authors_output)
-        parsed_idea["proposers"] = proposers
-
-    for k in proposal_mappings:
-        extracted = extract_mapping(proposal_mappings[k], temp_idea)
-        if extracted:
-            parsed_idea[k] = extracted
-
-    for k in extra_fields_map:
-        extracted = extract_mapping(extra_fields_map[k], extra_fields_idea)
-        if extracted:
-            if "extra_fields" not in parsed_idea:
-                parsed_idea["extra_fields"] = {}
-            parsed_idea["extra_fields"][k] = extracted
-    return parsed_idea
 
 
-def get_reviews(assessments, reviews_map):
-    print("[yellow]Preparing reviews...[/yellow]")
-    if assessments is False:
+def parse_pages(
+    ideas_pages,
+    context,
+    parse_workers=1,
+    metrics=None,
+    profiler=None,
+    delta=None,
+    skip_ids=None,
+):
+    """
+    Parse the ideas of `ideas_pages`, an iterable of `(ideas, challenge)`
+    (`challenge` is None when it has to be found from each idea campaign), and
+    yield them in order, numbering them with consecutive `internal_id`.
+
+    With `parse_workers` greater than 1 pages are parsed by a pool of
+    processes. The parse context is sent once to every worker when it starts,
+    each page is sent along with the `internal_id` of its ideas, and results
+    are yielded in the order pages were submitted.
+
+    With a `delta` import, ideas unchanged since the previous import are not
+    parsed: their previous proposal is yielded instead, and `internal_id` are
+    the ones given by the delta.
+
+    Ideas whose id is in `skip_ids` are neither parsed nor yielded, but their
+    `internal_id` is still used, so that the other ideas are numbered the
+    same as without skipping them.
+
+    Time spent parsing is added to the `parse` timer of `metrics`, and when
+    parsing inline a `profiler` can be enabled around it.
+    """
+    if metrics is None:
+        metrics = NullMetrics()
+    internal_id = 0
+
+    def plan(ideas, challenge):
+        # Ideas to parse with their internal_id, and proposals carried
+        # forward from the previous import by position in the page
+        nonlocal internal_id
+        internal_ids = range(internal_id, internal_id + len(ideas))
+        internal_id = internal_id + len(ideas)
+        if delta is None:
+            planned = ideas, internal_ids, {}
+        else:
+            planned = delta.plan(ideas, challenge, context)
+        if skip_ids:
+            return skip_ideas(ideas, *planned, skip_ids)
+        return planned
+
+    if parse_workers <= 1:
+        for ideas, challenge in ideas_pages:
+            to_parse, internal_ids, carried = plan(ideas, challenge)
+            with metrics.timer("parse"):
+                if profiler is not None:
+                    profiler.enable()
+                parsed_ideas = parse_page(to_parse, challenge, internal_ids, context)
+                if profiler is not None:
+                    profiler.disable()
+            yield from merge_carried(parsed_ideas, carried, len(ideas))
+        return
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Workers are started when the fetching threads (and the event loop of
+    # the async engine) are already running: forking would copy the locks
+    # they hold, so they are started from a fresh process instead
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context("forkserver")
+    else:
+        mp_context = multiprocessing.get_context("spawn")
+    max_pending = 2 * parse_workers
+    pending = deque()
+    with ProcessPoolExecutor(
+        max_workers=parse_workers,
+        mp_context=mp_context,
+        initializer=init_parse_worker,
+        initargs=(context,),
+    ) as executor:
+        for ideas, challenge in ideas_pages:
+            to_parse, internal_ids, carried = plan(ideas, challenge)
+            future = executor.submit(
+                parse_page_in_worker, to_parse, challenge, internal_ids
+            )
+            pending.append((future, carried, len(ideas)))
+            while len(pending) >= max_pending or pending[0][0].done():
+                future, carried, total = pending.popleft()
+                parsed_ideas, seconds = future.result()
+                metrics.add_time("parse", seconds)
+                yield from merge_carried(parsed_ideas, carried, total)
+                if not pending:
+                    break
+        while pending:
+            future, carried, total = pending.popleft()
+            parsed_ideas, seconds = future.result()
+            metrics.add_time("parse", seconds)
+            yield from merge_carried(parsed_ideas, carried, total)
+
+
+def skip_ideas(ideas, to_parse, internal_ids, carried, skip_ids):
+    # Leave the skipped ideas of a planned page out of the ideas to parse,
+    # and mark their position with None among the carried proposals
+    kept_ideas = []
+    kept_internal_ids = []
+    carried = dict(carried)
+    planned = 0
+    for n, idea in enumerate(ideas):
+        skip = idea["id"] in skip_ids
+        if n in carried:
+            if skip:
+                carried[n] = None
+            continue
+        if skip:
+            carried[n] = None
+        else:
+            kept_ideas.append(to_parse[planned])
+            kept_internal_ids.append(internal_ids[planned])
+        planned = planned + 1
+    return kept_ideas, kept_internal_ids, carried
+
+
+def merge_carried(parsed_ideas, carried, total):
+    # Put carried forward proposals back at their position in the page,
+    # leaving out skipped ideas
+    if len(carried) == 0:
+        return parsed_ideas
+    parsed_ideas = iter(parsed_ideas)
+    merged = [carried[n] if n in carried else next(parsed_ideas) for n in range(total)]
+    return [proposal for proposal in merged if proposal is not None]
+
+
+def parse_page(ideas, challenge, internal_ids, context):
+    parsed_ideas = []
+    for idea, internal_id in zip(ideas, internal_ids):
+        idea_challenge = challenge
+        if idea_challenge is None:
+            idea_challenge = find_challenge(
+                idea["campaignId"], context["challenge_index"]
+            )
+        parsed_idea = parse_idea(
+            idea,
+            context["fund_id"],
+            context["mapping_plan"],
+            idea_challenge,
+            context["chain_vote_type"],
+            internal_id,
+            context["score_index"],
+            context["authors_output"],
+        )
+        parsed_ideas.append(parsed_idea)
+    return parsed_ideas
+
+
+# Parse context of a parse worker process, set once when it starts
+_worker_context = None
+
+
+def init_parse_worker(context):
+    global _worker_context
+    _worker_context = context
+
+
+def parse_page_in_worker(ideas, challenge, internal_ids):
+    # Returns the parsed ideas and the time spent parsing them
+    start = time.perf_counter()
+    parsed_ideas = parse_page(ideas, challenge, internal_ids, _worker_context)
+    return parsed_ideas, time.perf_counter() - start
+
+
+def fetch_pages(streams, page_size, client, concurrency=1, journal=None):
+    """
+    Walk the paginated IdeaScale endpoints given as `streams` (URL prefixes
+    completed with `/{page}/{page_size}`) and yield `(stream, url, response)`
+    for every page, always in the order of the sequential walk: stream by
+    stream, page by page, stopping a stream at its first short page.
+
+    With `concurrency` greater than 1 pages are requested by a pool of
+    threads (or as coroutines on the event loop of an `AsyncIdeascaleClient`):
+    streams are fanned out in parallel and the page after the last full one
+    is requested speculatively. Once two pages of a stream came back full, up
+    to `PREFETCH_PAGES` pages after the awaited one are requested. Pages requested or fetched but not yielded
+    yet are bounded per stream and in total, so a slow page doesn't make the
+    following streams buffered whole. Pages beyond the end of a stream are
+    discarded, so the output doesn't change.
+
+    When a `journal` is given, pages already in it are replayed instead of
+    fetched, and every page yielded is recorded as completed or failed. A
+    stream is given up after `MAX_FAILED_PAGES` failed pages in a row.
+    """
+
+    def fetch(url, priority=PRIORITY_PAGE):
+        if journal is not None and url in journal:
+            return journal.get(url)
+        return client.get(url, priority)
+
+    async def fetch_async(url, priority=PRIORITY_PAGE):
+        if journal is not None and url in journal:
+            return journal.get(url)
+        return await client.get_async(url, priority)
+
+    def complete(url, response):
+        if journal is None:
+            return
+        if response is None:
+            journal.fail(url)
+        else:
+            journal.record(url, response)
+
+    failed_in_row = [0] * len(streams)
+
+    def give_up(stream, response):
+        # Count the failed pages in a row of `stream`
+        failed_in_row[stream] = failed_in_row[stream] + 1 if response is None else 0
+        if failed_in_row[stream] < MAX_FAILED_PAGES:
+            return False
+        print(f"[bold red]Giving up {streams[stream]} after failed pages[/bold red]")
+        return True
+
+    if concurrency <= 1:
+        for stream, url_prefix in enumerate(streams):
+            for page in range(MAX_PAGES_TO_QUERY):
+                url = f"{url_prefix}/{page}/{page_size}"
+                response = fetch(url)
+                complete(url, response)
+                yield stream, url, response
+                if give_up(stream, response):
+                    break
+                if response is not None and len(response) < page_size:
+                    # Break page loop if there are no results - thanks IdeaScale
+                    # pagination implementation
+                    break
+        return
+
+    window = 1 + PREFETCH_PAGES
+    max_pending = concurrency * window
+    # Last page to request for each stream, lowered on the first short page
+    last_page = [MAX_PAGES_TO_QUERY - 1] * len(streams)
+    next_page = [0] * len(streams)
+    # Last page of each stream known to be full. Only the page after it is
+    # requested, most streams having one or two pages, and more pages ahead
+    # once two pages came back full
+    last_full = [-1] * len(streams)
+    # Pages requested or fetched and not yielded yet, in each stream and in
+    # total
+    stream_pending = [0] * len(streams)
+    pending = 0
+    fetched = [{} for _ in streams]
+    in_flight = {}
+    current_stream = 0
+    current_page = 0
+
+    def schedule(executor, fetch):
+        nonlocal pending
+        for stream in range(current_stream, len(streams)):
+            while (
+                stream_pending[stream] < window
+                and next_page[stream] <= last_page[stream]
+            ):
+                page = next_page[stream]
+                awaited = stream == current_stream and page == current_page
+                known_long = last_full[stream] >= 1
+                if not awaited and not known_long and page > last_full[stream] + 1:
+                    break
+                # The awaited page is always requested, even when later
+                # streams fill the limit
+                if pending >= max_pending and not awaited:
+                    break
+                url = f"{streams[stream]}/{page}/{page_size}"
+                # Pages requested while a previous one is pending are
+                # speculative: the stream could end before them.
+                if stream_pending[stream] > 0:
+                    priority = PRIORITY_PREFETCH
+                else:
+                    priority = PRIORITY_PAGE
+                future = executor.submit(fetch, url, priority)
+                in_flight[future] = (stream, page, url)
+                stream_pending[stream] += 1
+                pending += 1
+                next_page[stream] += 1
+            if pending >= max_pending:
+                break
+
+    def discard(stream, pages):
+        # Drop fetched pages past the end of `stream`
+        nonlocal pending
+        for page in pages:
+            del fetched[stream][page]
+            stream_pending[stream] -= 1
+            pending -= 1
+
+    if isinstance(client, AsyncIdeascaleClient):
+        executor = AsyncExecutor(client.loop)
+        fetch = fetch_async
+    else:
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+    with executor:
+        while current_stream < len(streams):
+            schedule(executor, fetch)
+            if current_page in fetched[current_stream]:
+                url, response = fetched[current_stream].pop(current_page)
+                stream_pending[current_stream] -= 1
+                pending -= 1
+                complete(url, response)
+                yield current_stream, url, response
+                if give_up(current_stream, response):
+                    last_page[current_stream] = current_page
+                    discard(current_stream, list(fetched[current_stream]))
+                if current_page >= last_page[current_stream]:
+                    current_stream += 1
+                    current_page = 0
+                else:
+                    current_page += 1
+                continue
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                stream, page, url = in_flight.pop(future)
+                response = future.result()
+                if page > last_page[stream]:
+                    # Speculative request past the end of the stream
+                    stream_pending[stream] -= 1
+                    pending -= 1
+                    continue
+                fetched[stream][page] = (url, response)
+                if response is not None and len(response) < page_size:
+                    last_page[stream] = page
+                    discard(stream, [p for p in fetched[stream] if p > page])
+                elif response is not None:
+                    last_full[stream] = max(last_full[stream], page)
+
+
+def parse_idea(
+    idea,
+    fund_id,
+    mapping_plan,
+    challenge,
+    chain_vote_type,
+    internal_id,
+    score_index,
+    authors_output,
+):
+    custom_fields = idea["customFieldsByKey"]
+    parsed_idea = ProposalRecord()
+    # The same string is shared by all the proposals of a fund, like the
+    # other constant fields
+    parsed_idea.category_name = sys.intern(f"Fund {fund_id}")
+    parsed_idea.chain_vote_options = "blank,yes,no"
+    parsed_idea.challenge_id = challenge["id"]
+    parsed_idea.challenge_type = challenge["challenge_type"]
+    parsed_idea.chain_vote_type = chain_vote_type
+    parsed_idea.internal_id = internal_id
+    parsed_idea.proposal_id = idea["id"]
+    parsed_idea.proposal_impact_score = extract_score(idea["id"], score_index)
+    parsed_idea.proposal_summary = strip_tags(idea["text"])
+    parsed_idea.proposal_title = strip_tags(idea["title"])
+    parsed_idea.proposal_url = idea["url"]
+    parsed_idea.files_url = (
+        custom_fields["f11_open_source_choice"],
+        custom_fields["f11_link_1"],
+        custom_fields["f11_link_2"],
+        custom_fields["f11_link_3"],
+        custom_fields[THEME_CUSTOM_KEY],
+    )
+    if authors_output == "std" or authors_output == "merged_str":
+        proposers_name = extract_proposers(idea, authors_output)
+        # parsed_idea['proposer_email'] = idea["authorInfo"]["email"]
+        parsed_idea.proposer_name = proposers_name
+    else:
+        proposers = extract_proposers(idea, authors_output)
+        parsed_idea.proposers = proposers
+
+    mapped, extra_fields = resolve_mappings(custom_fields, mapping_plan)
+    parsed_idea.mapped = mapped
+    if extra_fields:
+        parsed_idea.extra_fields = extra_fields
+    return parsed_idea
+
+
+class ProposalRecord:
+    """
+    A parsed proposal, lighter than a dict of its fields.
+
+    The fields every proposal has are slots (unset when a proposal doesn't
+    have them), `files_url` is kept as a tuple and only the fields mapped by
+    the templates are in a dict, `mapped`, which take precedence over the
+    others as they did when proposals were dicts. Proposals are exported by
+    `export`, which reads the fields of a format straight from the record.
+    """
+
+    __slots__ = (
+        "category_name",
+        "chain_vote_options",
+        "challenge_id",
+        "challenge_type",
+        "chain_vote_type",
+        "internal_id",
+        "proposal_id",
+        "proposal_impact_score",
+        "proposal_summary",
+        "proposal_title",
+        "proposal_url",
+        "files_url",
+        "proposer_name",
+        "proposers",
+        "mapped",
+        "extra_fields",
+    )
+    FIELDS = frozenset(__slots__) - {"mapped"}
+    FILES_URL_KEYS = (
+        "open_source",
+        "external_link1",
+        "external_link2",
+        "external_link3",
+        "themes",
+    )
+    FILES_URL_FORMAT = "{" + ", ".join(f"{k!r}: %r" for k in FILES_URL_KEYS) + "}"
+
+    def export(self, fields):
+        # Same as export_element on the dict of the proposal, `fields` being
+        # the result of compile_format
+        exported = {}
+        mapped = self.mapped
+        for k, cast in fields:
+            if k in mapped:
+                value = mapped[k]
+            elif k in self.FIELDS:
+                value = getattr(self, k, MISSING)
+                if value is MISSING:
+                    continue
+                if k == "files_url":
+                    if cast is str:
+                        # The str of its dict, without building it
+                        exported[k] = self.FILES_URL_FORMAT % value
+                        continue
+                    value = dict(zip(self.FILES_URL_KEYS, value))
+            else:
+                continue
+            exported[k] = value if cast is None else cast(value)
+        return exported
+
+
+# Marks a field unset in a ProposalRecord
+MISSING = object()
+
+
+def get_reviews(assessments, reviews_map):
+    if assessments is False:
         return []
     relevant = assessments[reviews_map["cols"].keys()]
     reviews = relevant.rename(columns=reviews_map["cols"])
-    reviews = reviews.to_dict("records")
-    return reviews
+    return export_frame(reviews, reviews_map)
 
 
 def round_mean(x):
@@ -387,7 +1804,7 @@ def round_mean(x):
 def get_scores(assessments):
     print("[yellow]Preparing proposals scores...[/yellow]")
     if assessments is False:
-        return pd.DataFrame([])
+        return False
     # Calculate scores from assessments. Group by proposal id and calculate avg
     all_proposals = assessments.groupby("proposal_id", as_index=False).agg(
         {"Rating": round_mean}
@@ -396,43 +1813,1189 @@ def get_scores(assessments):
     return all_proposals
 
 
-def ideascale_get(url, token):
-    """HTTP Client to call the IdeaScale API. Returns a response object or None."""
-    # Initialize response to None
-    response = None
-    # Setup a retry strategy for failing requests
-    retry_strategy = Retry(
-        total=5,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["HEAD", "GET", "OPTIONS"],
-        backoff_factor=1,
+def save_scores(path, scores):
+    if scores is False:
+        # Same empty file saved by pandas for an empty data frame
+        with open(path, "w") as outfile:
+            outfile.write("\n")
+    else:
+        scores.to_csv(path, index=False)
+
+
+def get_score_index(assessments):
+    # Average rating of each proposal, indexed by proposal_id, so that
+    # proposals scores are looked up instead of querying all the assessments.
+    if assessments is False:
+        return False
+    ratings = assessments.groupby("proposal_id")["Rating"].agg(
+        lambda rating: rating.mean()
     )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    http = requests.Session()
-    http.mount("https://", adapter)
-    http.mount("http://", adapter)
-    headers = {"api_token": token}
-    print("Requesting url: {}".format(url))
-    r = http.get(url, headers=headers)
+    return ratings.to_dict()
+
+
+class IdeascaleClient:
+    """
+    HTTP Client to call the IdeaScale API.
+
+    A single session is shared by all the requests, so that keep-alive
+    connections are pooled and reused instead of paying a new handshake for
+    every page. The session is safe to share between the fetching threads.
+    """
+
+    def __init__(
+        self,
+        token,
+        pool_size=10,
+        cache=None,
+        offline=False,
+        metrics=None,
+        rate_limiter=None,
+    ):
+        self.cache = cache
+        self.offline = offline
+        self.metrics = metrics if metrics is not None else NullMetrics()
+        self.rate_limiter = rate_limiter
+        # Setup a retry strategy for failing requests. With a rate limiter
+        # throttled requests (429) and server errors are retried by the
+        # client through it, urllib3 only retries connection errors.
+        status_forcelist = []
+        if rate_limiter is None:
+            status_forcelist = SERVER_ERRORS + [429]
+        import requests
+        from requests.adapters import HTTPAdapter
+        from requests.packages.urllib3.util.retry import Retry
+
+        retry_strategy = Retry(
+            total=MAX_RETRIES,
+            status_forcelist=status_forcelist,
+            allowed_methods=["HEAD", "GET", "OPTIONS"],
+            backoff_factor=1,
+        )
+        self.adapter = HTTPAdapter(
+            max_retries=retry_strategy,
+            pool_maxsize=pool_size,
+            pool_block=True,
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers.update(
+            {
+                "api_token": token,
+                "Accept-Encoding": "gzip, deflate",
+                "Connection": "keep-alive",
+            }
+        )
+
+    def get(self, url, priority=PRIORITY_PAGE):
+        """Returns the JSON response of a GET request or None."""
+        done, response, headers, cached = self.lookup(url)
+        if done:
+            return response
+        import requests
+
+        print("Requesting url: {}".format(url))
+        attempts = {"throttled": 0, "failed": 0}
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(priority)
+            with self.metrics.timer("fetch"):
+                start = time.perf_counter()
+                try:
+                    r = self.session.get(url, headers=headers)
+                except requests.RequestException as e:
+                    # Connection errors, or retries exhausted on 5xx: the
+                    # page is failed and the import goes on without it
+                    print(f"[bold red]Unable to request {url}: {e}[/bold red]")
+                    return None
+                self.metrics.record_request(url, r, time.perf_counter() - start)
+            if self.rate_limiter is None:
+                break
+            delay = self.retry(r, attempts)
+            if delay is None:
+                break
+            time.sleep(delay)
+        return self.handle(url, r, cached)
+
+    def retry(self, r, attempts):
+        """
+        Tell the rate limiter how the request went. Returns the seconds to
+        wait before sending it again through the rate limiter, or None when
+        `r` is final. `attempts` counts the retries already made.
+        """
+        if r.status_code == 429:
+            self.rate_limiter.throttle(r.headers.get("Retry-After"))
+            attempts["throttled"] += 1
+            if attempts["throttled"] < MAX_THROTTLED_ATTEMPTS:
+                return 0
+        elif r.status_code in SERVER_ERRORS:
+            attempts["failed"] += 1
+            if attempts["failed"] <= MAX_RETRIES:
+                return retry_backoff(attempts["failed"])
+        elif r.status_code < 500:
+            self.rate_limiter.succeeded()
+        return None
+
+    def lookup(self, url):
+        """
+        Look `url` up in the cache. Returns `(done, response, headers, cached)`:
+        when `done` the `response` is final and no request has to be sent,
+        otherwise the request is sent with `headers` to revalidate `cached`.
+        """
+        headers = {}
+        cached = None
+        if self.cache is not None:
+            cached = self.cache.load(url)
+            if cached is not None and (self.offline or self.cache.is_fresh(cached)):
+                self.metrics.record_cache_hit(url)
+                return True, json.loads(cached["body"]), headers, cached
+            if self.offline:
+                print(f"[bold red]Response not cached for {url}[/bold red]")
+                return True, None, headers, cached
+            if cached is not None:
+                # Revalidate the cached response when the server supports it
+                if cached["etag"]:
+                    headers["If-None-Match"] = cached["etag"]
+                if cached["last_modified"]:
+                    headers["If-Modified-Since"] = cached["last_modified"]
+        return False, None, headers, cached
+
+    def handle(self, url, r, cached):
+        """Returns the JSON of the response `r` to `url` or None."""
+        # Initialize response to None
+        response = None
+        try:
+            # Return JSON when the response is 200
+            if r.status_code == 200:
+                response = r.json()
+                if self.cache is not None:
+                    self.cache.store(
+                        url,
+                        r.text,
+                        r.headers.get("ETag"),
+                        r.headers.get("Last-Modified"),
+                    )
+            elif r.status_code == 304 and cached is not None:
+                response = json.loads(cached["body"])
+                self.cache.store(
+                    url, cached["body"], cached["etag"], cached["last_modified"]
+                )
+            else:
+                print(f"Error {r.status_code}")
+        except Exception as e:
+            print("Something wrong with Ideascale")
+            print(e)
+        finally:
+            return response
+
+    def connection_stats(self):
+        """Count requests and connections opened by the pooled session."""
+        requests_count = 0
+        connections = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            requests_count += pool.num_requests
+            connections += pool.num_connections
+        return {
+            "requests": requests_count,
+            "connections": connections,
+            "reused": requests_count - connections,
+        }
+
+    def close(self):
+        self.session.close()
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all the requests sent to IdeaScale.
+
+    Requests wait for a token before being sent, at most `rate` per second.
+    The rate adapts to IdeaScale: every throttled (429) response halves it
+    and pauses all the requests for the `Retry-After` time, while every
+    successful one raises it a little, up to `max_rate`. Requests with a
+    higher priority (lower value) are always served before the others.
+    """
+
+    def __init__(self, rate, max_rate, min_rate=0.5):
+        self.rate = min(rate, max_rate)
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.throttled = 0
+        self.waiting = [0, 0]
+        self.condition = threading.Condition()
+
+    def refill(self, now):
+        capacity = max(1.0, self.rate)
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, priority):
+        # Take a token, returning 0, or return the seconds to wait for one
+        # (None while higher priority requests wait). Holding the condition.
+        now = time.monotonic()
+        self.refill(now)
+        blocked = any(self.waiting[p] > 0 for p in range(priority))
+        if now < self.paused_until:
+            return self.paused_until - now
+        elif blocked:
+            return None
+        elif self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        self.tokens -= 1
+        return 0
+
+    def acquire(self, priority=PRIORITY_PAGE):
+        with self.condition:
+            self.waiting[priority] += 1
+            try:
+                while True:
+                    delay = self.take(priority)
+                    if delay == 0:
+                        return
+                    # Woken up when a higher priority request is served
+                    self.condition.wait(delay)
+            finally:
+                self.waiting[priority] -= 1
+                self.condition.notify_all()
+
+    async def acquire_async(self, priority=PRIORITY_PAGE):
+        # Same as acquire for requests sent from an event loop, which can't
+        # block on the condition: the wait is slept instead.
+        import asyncio
+
+        with self.condition:
+            self.waiting[priority] += 1
+        try:
+            while True:
+                with self.condition:
+                    delay = self.take(priority)
+                if delay == 0:
+                    return
+                await asyncio.sleep(RATE_LIMIT_POLL if delay is None else delay)
+        finally:
+            with self.condition:
+                self.waiting[priority] -= 1
+                self.condition.notify_all()
+
+    def succeeded(self):
+        with self.condition:
+            # Additive increase: about one more request per second each second
+            self.rate = min(self.max_rate, self.rate + 1 / self.rate)
+
+    def throttle(self, retry_after=None):
+        with self.condition:
+            self.throttled += 1
+            # Multiplicative decrease
+            self.rate = max(self.min_rate, self.rate / 2)
+            now = time.monotonic()
+            pause = parse_retry_after(retry_after)
+            if pause is None:
+                pause = 1 / self.rate
+            self.paused_until = max(self.paused_until, now + pause)
+            self.tokens = 0.0
+            self.updated = now
+            self.condition.notify_all()
+
+
+def retry_backoff(retry):
+    # Seconds before the `retry`-th retry of a failed request, the backoff of
+    # urllib3 with a backoff factor of 1: 0, 2, 4, 8... seconds
+    if retry <= 1:
+        return 0
+    return 2 ** (retry - 1)
+
+
+def parse_retry_after(value):
+    # Retry-After can be a number of seconds or an HTTP date
+    if value is None:
+        return None
     try:
-        # Return JSON when the response is 200
-        if r.status_code == 200:
-            response = r.json()
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    import email.utils
+
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+def import_httpx():
+    try:
+        import httpx
+    except ImportError:
+        raise typer.BadParameter(
+            "The async engine needs httpx, install it with `pip install httpx[http2]`"
+        )
+    return httpx
+
+
+class AsyncIdeascaleClient(IdeascaleClient):
+    """
+    HTTP Client to call the IdeaScale API from an asyncio event loop.
+
+    Requests are coroutines sent with httpx, multiplexed over HTTP/2 when the
+    `h2` package is installed, at most `pool_size` at once. The event loop
+    runs in a thread of its own: `get` can be called from synchronous code
+    like with `IdeascaleClient`, and `fetch_pages` submits `get_async` to the
+    loop instead of using a pool of threads.
+    """
+
+    def __init__(
+        self,
+        token,
+        pool_size=10,
+        cache=None,
+        offline=False,
+        metrics=None,
+        rate_limiter=None,
+    ):
+        import asyncio
+        import importlib.util
+
+        httpx = import_httpx()
+        # HTTP/2 needs the optional h2 package, used by httpx itself
+        http2 = importlib.util.find_spec("h2") is not None
+        self.httpx = httpx
+        self.cache = cache
+        self.offline = offline
+        self.metrics = metrics if metrics is not None else NullMetrics()
+        self.rate_limiter = rate_limiter
+        # Same as IdeascaleClient: with a rate limiter only connection errors
+        # are retried by request
+        self.status_forcelist = []
+        if rate_limiter is None:
+            self.status_forcelist = SERVER_ERRORS + [429]
+        self.requests = 0
+        self.connections = set()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.semaphore = asyncio.Semaphore(pool_size)
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            headers={"api_token": token, "Accept-Encoding": "gzip, deflate"},
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+            # Like requests, wait for Ideascale as long as it takes
+            timeout=None,
+        )
+
+    def get(self, url, priority=PRIORITY_PAGE):
+        """Returns the JSON response of a GET request or None."""
+        import asyncio
+
+        future = asyncio.run_coroutine_threadsafe(
+            self.get_async(url, priority), self.loop
+        )
+        return future.result()
+
+    async def get_async(self, url, priority=PRIORITY_PAGE):
+        """Returns the JSON response of a GET request or None."""
+        done, response, headers, cached = self.lookup(url)
+        if done:
+            return response
+        import asyncio
+
+        print("Requesting url: {}".format(url))
+        attempts = {"throttled": 0, "failed": 0}
+        async with self.semaphore:
+            while True:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire_async(priority)
+                with self.metrics.timer("fetch"):
+                    try:
+                        r = await self.request(url, headers)
+                    except self.httpx.HTTPError as e:
+                        # Same as IdeascaleClient.get: the page is failed
+                        print(f"[bold red]Unable to request {url}: {e}[/bold red]")
+                        return None
+                if self.rate_limiter is None:
+                    break
+                delay = self.retry(r, attempts)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+        return self.handle(url, r, cached)
+
+    async def request(self, url, headers):
+        # Retry connection and server errors with the backoff of urllib3
+        # used by the threads engine: 0, 2, 4, 8... seconds.
+        import asyncio
+
+        for retry in range(MAX_RETRIES + 1):
+            if retry > 0:
+                await asyncio.sleep(retry_backoff(retry))
+            start = time.perf_counter()
+            try:
+                r = await self.client.get(url, headers=headers)
+            except self.httpx.TransportError:
+                if retry == MAX_RETRIES:
+                    raise
+                continue
+            self.metrics.record_request(url, r, time.perf_counter() - start)
+            self.requests += 1
+            self.connections.add(r.extensions.get("network_stream"))
+            if r.status_code not in self.status_forcelist:
+                return r
+            if retry == MAX_RETRIES:
+                r.raise_for_status()
+        return r
+
+    def connection_stats(self):
+        """Count requests and connections opened by the client."""
+        return {
+            "requests": self.requests,
+            "connections": len(self.connections),
+            "reused": self.requests - len(self.connections),
+        }
+
+    def close(self):
+        import asyncio
+
+        asyncio.run_coroutine_threadsafe(self.client.aclose(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+class AsyncExecutor:
+    """
+    Submit coroutines to an event loop running in another thread, with the
+    `submit` of a `ThreadPoolExecutor`: the futures returned can be waited
+    with `concurrent.futures.wait`. Pending coroutines are cancelled when
+    leaving the executor on an error or interruption (e.g. Ctrl-C).
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.futures = set()
+
+    def submit(self, fn, *args):
+        import asyncio
+
+        future = asyncio.run_coroutine_threadsafe(fn(*args), self.loop)
+        self.futures.add(future)
+        future.add_done_callback(self.futures.discard)
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            wait(list(self.futures))
         else:
-            print(f"Error {r.status_code}")
-    except Exception as e:
-        print("Something wrong with Ideascale")
-        print(e)
-    finally:
-        return response
+            for future in list(self.futures):
+                future.cancel()
 
 
-def save_json(path, data):
-    with open(path, "w") as outfile:
-        json.dump(data, outfile, indent=2)
+class Metrics:
+    """
+    Timers and requests metrics of an import.
+
+    Timers accumulate the seconds spent in each phase (fetch, parse, export,
+    ...) and how many times it was entered; with concurrent fetching or
+    parsing they sum the time of every thread or process. Requests are
+    counted by endpoint, with their statuses, retries, bytes and a latency
+    histogram.
+    """
+
+    def __init__(self):
+        self.start = time.time()
+        self.lock = threading.Lock()
+        self.phases = {}
+        self.endpoints = {}
+
+    @contextmanager
+    def timer(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start)
+
+    def add_time(self, phase, seconds):
+        with self.lock:
+            timer = self.phases.setdefault(phase, {"seconds": 0.0, "count": 0})
+            timer["seconds"] += seconds
+            timer["count"] += 1
+
+    def endpoint(self, url):
+        # Group URLs by endpoint replacing ids, stages and pages
+        path = urlsplit(url).path
+        path = re.sub(r"/\d+(?=/|$)", "/{id}", path)
+        if path not in self.endpoints:
+            self.endpoints[path] = {
+                "requests": 0,
+                "cache_hits": 0,
+                "statuses": {},
+                "retries": 0,
+                "bytes": 0,
+                "latency": {
+                    "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+                    "sum": 0.0,
+                },
+            }
+        return self.endpoints[path]
+
+    def record_request(self, url, response, seconds):
+        # Retries made by urllib3, the async client records every attempt
+        retries = getattr(getattr(response, "raw", None), "retries", None)
+        with self.lock:
+            endpoint = self.endpoint(url)
+            endpoint["requests"] += 1
+            status = str(response.status_code)
+            endpoint["statuses"][status] = endpoint["statuses"].get(status, 0) + 1
+            if retries is not None:
+                endpoint["retries"] += len(retries.history)
+            endpoint["bytes"] += len(response.content)
+            bucket = len(LATENCY_BUCKETS)
+            for n, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    bucket = n
+                    break
+            endpoint["latency"]["buckets"][bucket] += 1
+            endpoint["latency"]["sum"] += seconds
+
+    def record_cache_hit(self, url):
+        with self.lock:
+            self.endpoint(url)["cache_hits"] += 1
+
+    def to_dict(self):
+        return {
+            "wall_time": time.time() - self.start,
+            "phases": self.phases,
+            "endpoints": {
+                path: dict(
+                    endpoint,
+                    latency={
+                        "buckets": dict(
+                            zip(
+                                [str(b) for b in LATENCY_BUCKETS] + ["+Inf"],
+                                endpoint["latency"]["buckets"],
+                            )
+                        ),
+                        "sum": endpoint["latency"]["sum"],
+                    },
+                )
+                for path, endpoint in self.endpoints.items()
+            },
+        }
+
+    def save(self, path):
+        save_json(path, self.to_dict())
+
+    def save_prometheus(self, path):
+        prefix = "ideascale_import"
+        lines = [
+            f"# TYPE {prefix}_wall_time_seconds gauge",
+            f"{prefix}_wall_time_seconds {time.time() - self.start}",
+            f"# TYPE {prefix}_phase_seconds gauge",
+        ]
+        for phase, timer in self.phases.items():
+            lines.append(f'{prefix}_phase_seconds{{phase="{phase}"}} {timer["seconds"]}')
+        lines.append(f"# TYPE {prefix}_requests_total counter")
+        for endpoint_path, endpoint in self.endpoints.items():
+            for status, count in endpoint["statuses"].items():
+                lines.append(
+                    f'{prefix}_requests_total{{endpoint="{endpoint_path}",status="{status}"}} {count}'
+                )
+        for metric in ["cache_hits", "retries", "bytes"]:
+            lines.append(f"# TYPE {prefix}_{metric}_total counter")
+            for endpoint_path, endpoint in self.endpoints.items():
+                lines.append(
+                    f'{prefix}_{metric}_total{{endpoint="{endpoint_path}"}} {endpoint[metric]}'
+                )
+        lines.append(f"# TYPE {prefix}_request_duration_seconds histogram")
+        for endpoint_path, endpoint in self.endpoints.items():
+            metric = f"{prefix}_request_duration_seconds"
+            cumulative = 0
+            bounds = [str(b) for b in LATENCY_BUCKETS] + ["+Inf"]
+            for bound, count in zip(bounds, endpoint["latency"]["buckets"]):
+                cumulative += count
+                lines.append(
+                    f'{metric}_bucket{{endpoint="{endpoint_path}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f'{metric}_sum{{endpoint="{endpoint_path}"}} {endpoint["latency"]["sum"]}'
+            )
+            lines.append(f'{metric}_count{{endpoint="{endpoint_path}"}} {cumulative}')
+        with open(path, "w") as outfile:
+            outfile.write("\n".join(lines) + "\n")
+
+
+class NullMetrics:
+    """Metrics doing nothing, used when metrics are disabled."""
+
+    _timer = nullcontext()
+
+    def timer(self, phase):
+        return self._timer
+
+    def add_time(self, phase, seconds):
+        pass
+
+    def record_request(self, url, response, seconds):
+        pass
+
+    def record_cache_hit(self, url):
+        pass
+
+    def save(self, path):
+        pass
+
+    def save_prometheus(self, path):
+        pass
+
+
+class ResponseCache:
+    """
+    Persistent cache of IdeaScale responses, one file per URL in `cache_dir`.
+
+    Each file holds a line of metadata (URL, storage time and the validators
+    returned by the server) followed by the raw response body. Responses
+    younger than `ttl` seconds are used as they are, older ones are
+    revalidated by the client. When the cache grows over `max_size` bytes the
+    least recently used responses are evicted.
+    """
+
+    def __init__(self, cache_dir, ttl=3600, max_size=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        # Size and last use time of every cached response, by key
+        self.entries = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        for name in os.listdir(cache_dir):
+            if name.endswith(".cache"):
+                stat = os.stat(os.path.join(cache_dir, name))
+                self.entries[name[: -len(".cache")]] = [stat.st_size, stat.st_mtime]
+        self.size = sum(size for size, _ in self.entries.values())
+
+    def key(self, url):
+        # Tokens never take part of the key
+        parts = urlsplit(url)
+        query = [
+            (k, v)
+            for k, v in parse_qsl(parts.query)
+            if k not in CACHE_EXCLUDED_PARAMS
+        ]
+        url = urlunsplit(parts._replace(query=urlencode(query)))
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.cache")
+
+    def load(self, url):
+        key = self.key(url)
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries[key][1] = time.time()
+        try:
+            with open(self.path(key)) as cache_file:
+                meta = json.loads(cache_file.readline())
+                meta["body"] = cache_file.read()
+            # File modification time keeps track of the use between runs
+            os.utime(self.path(key))
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def is_fresh(self, cached):
+        return time.time() - cached["stored_at"] < self.ttl
+
+    def store(self, url, body, etag=None, last_modified=None):
+        key = self.key(url)
+        meta = {
+            "url": url,
+            "stored_at": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+        path = self.path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as cache_file:
+            cache_file.write(json.dumps(meta) + "\n")
+            cache_file.write(body)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries[key][0]
+            self.entries[key] = [size, time.time()]
+            self.size += size
+            self.evict()
+
+    def evict(self):
+        if self.size <= self.max_size:
+            return
+        by_last_use = sorted(self.entries, key=lambda k: self.entries[k][1])
+        for key in by_last_use:
+            if self.size <= self.max_size:
+                break
+            size, _ = self.entries.pop(key)
+            self.size -= size
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+
+def save_json(path, data, serializer=None):
+    if serializer is None:
+        serializer = JsonSerializer()
+    with open(path, "w", encoding="utf-8") as outfile:
+        outfile.write(serializer.dumps(data))
         outfile.close()
 
 
+class JsonSerializer:
+    """
+    Serialize JSON outputs in one of `JSON_FORMATS`:
+
+    - `compat`: the layout of `json.dump(data, indent=2)`, byte for byte, so
+      outputs can be compared with the ones of previous imports.
+    - `indented`: the same indentation, with non-ASCII characters written as
+      UTF-8 instead of escaped.
+    - `compact`: without any whitespace, in UTF-8.
+
+    `indented` and `compact` are serialized by orjson when it is installed,
+    and by the standard library otherwise.
+    """
+
+    def __init__(self, json_format="compat"):
+        self.json_format = json_format
+        self.indent = json_format != "compact"
+        self.orjson = None
+        if json_format != "compat":
+            try:
+                import orjson
+
+                self.orjson = orjson
+            except ImportError:
+                pass
+
+    def dumps(self, data):
+        if self.orjson is not None:
+            option = self.orjson.OPT_NON_STR_KEYS
+            if self.indent:
+                option |= self.orjson.OPT_INDENT_2
+            return self.orjson.dumps(data, option=option).decode()
+        if self.json_format == "compat":
+            return json.dumps(data, indent=2)
+        if self.indent:
+            return json.dumps(data, indent=2, ensure_ascii=False)
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+class ImportJournal:
+    """
+    Checkpoint journal of the proposals pages fetched by an import.
+
+    Every completed page is appended to `path` as a JSON line holding its
+    URL, which identifies the challenge, stage and page, and its raw payload.
+    When resuming, pages found in the journal are replayed from it instead of
+    being requested again. Pages that couldn't be fetched are collected in
+    `failed`.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.failed = []
+        self.lock = threading.Lock()
+        # Offset in the journal of every completed page, by URL
+        self.offsets = {}
+        if resume and os.path.exists(path):
+            with open(path, "rb") as journal_file:
+                offset = 0
+                for line in journal_file:
+                    try:
+                        self.offsets[json.loads(line)["url"]] = offset
+                    except (ValueError, KeyError):
+                        # Last line could be truncated by an interrupted run
+                        break
+                    offset += len(line)
+            # Drop anything after the last complete line
+            with open(path, "ab") as journal_file:
+                journal_file.truncate(offset)
+            print(f"[yellow]Resuming import, {len(self.offsets)} pages already fetched[/yellow]")
+        self.file = open(path, "ab" if resume else "wb")
+        self.reader = open(path, "rb")
+
+    def __contains__(self, url):
+        return url in self.offsets
+
+    def get(self, url):
+        with self.lock:
+            self.reader.seek(self.offsets[url])
+            line = self.reader.readline()
+        return json.loads(line)["response"]
+
+    def record(self, url, response):
+        if url in self.offsets:
+            return
+        line = json.dumps({"url": url, "response": response}) + "\n"
+        with self.lock:
+            self.offsets[url] = self.file.tell()
+            self.file.write(line.encode())
+            self.file.flush()
+
+    def fail(self, url):
+        self.failed.append(url)
+
+    def close(self, remove=False):
+        self.file.close()
+        self.reader.close()
+        if remove:
+            os.remove(self.path)
+
+
+class CarriedProposal(dict):
+    """Exported proposal carried forward unchanged from a previous import."""
+
+
+def get_delta_context(
+    fund_id,
+    challenges,
+    proposal_mappings,
+    extra_fields_map,
+    chain_vote_type,
+    authors_output,
+    proposals_format,
+    slug_urls="",
+):
+    # Hash of everything, but the idea itself, that a proposal depends on
+    context = [
+        fund_id,
+        [[c["id"], c["internal_id"], c["challenge_type"]] for c in challenges],
+        proposal_mappings,
+        extra_fields_map,
+        chain_vote_type,
+        authors_output,
+        proposals_format,
+    ]
+    if slug_urls != "":
+        # Proposals URLs are rewritten from the slug URLs file. Without it
+        # the hash is the same as before the option existed.
+        with open(slug_urls, "rb") as urls_file:
+            urls_hash = hashlib.sha256(urls_file.read()).hexdigest()
+        context.append(["slug_urls", slug_urls, urls_hash])
+    return hashlib.sha256(json.dumps(context, sort_keys=True).encode()).hexdigest()
+
+
+class DeltaImport:
+    """
+    Delta import, re-parsing only ideas that changed since the previous one.
+
+    The manifest saved next to `proposals.json` keeps, for every idea of the
+    previous import, a hash of its content (including its challenge and
+    score) and its `internal_id`. Unchanged ideas are carried forward from the
+    previous `proposals.json`, changed ideas are parsed again keeping their
+    `internal_id` and new ideas are numbered after the highest one. When the
+    templates or options differ from the previous import every idea is parsed
+    again, still keeping `internal_id` stable.
+    """
+
+    def __init__(self, output_dir, context_hash):
+        self.manifest_path = f"{output_dir}/proposals-manifest.json"
+        self.report_path = f"{output_dir}/delta-report.json"
+        self.context_hash = context_hash
+        self.previous = {}
+        self.proposals = {}
+        proposals_path = f"{output_dir}/proposals.json"
+        if os.path.exists(self.manifest_path) and os.path.exists(proposals_path):
+            with open(self.manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+            self.previous = manifest["ideas"]
+            if manifest["context"] == context_hash:
+                with open(proposals_path) as proposals_file:
+                    for proposal in json.load(proposals_file):
+                        if "proposal_id" in proposal:
+                            self.proposals[str(proposal["proposal_id"])] = proposal
+            else:
+                print("[yellow]Templates or options changed, parsing all proposals[/yellow]")
+        else:
+            print("[yellow]No previous import found, parsing all proposals[/yellow]")
+        self.next_internal_id = 1 + max(
+            [idea["internal_id"] for idea in self.previous.values()], default=-1
+        )
+        self.ideas = {}
+        self.added = []
+        self.changed = []
+        self.unchanged = 0
+
+    def plan(self, ideas, challenge, context):
+        # Returns the ideas to parse with their internal_id, and the proposals
+        # carried forward by position in the page
+        to_parse = []
+        internal_ids = []
+        carried = {}
+        challenge_id = challenge["internal_id"] if challenge is not None else None
+        for n, idea in enumerate(ideas):
+            idea_id = str(idea["id"])
+            score = extract_score(idea["id"], context["score_index"])
+            content = json.dumps([idea, challenge_id, score], sort_keys=True)
+            idea_hash = hashlib.sha256(content.encode()).hexdigest()
+            previous = self.previous.get(idea_id)
+            if previous is None:
+                internal_id = self.next_internal_id
+                self.next_internal_id += 1
+                self.added.append(idea_id)
+            else:
+                internal_id = previous["internal_id"]
+                if previous["hash"] == idea_hash and idea_id in self.proposals:
+                    carried[n] = CarriedProposal(self.proposals[idea_id])
+                    self.unchanged += 1
+                else:
+                    self.changed.append(idea_id)
+            self.ideas[idea_id] = {"hash": idea_hash, "internal_id": internal_id}
+            if n not in carried:
+                to_parse.append(idea)
+                internal_ids.append(internal_id)
+        return to_parse, internal_ids, carried
+
+    def save(self, complete=True):
+        """
+        Save the manifest and the report of the import. When the import is
+        not `complete` (some pages failed), ideas of the previous import not
+        seen in this one are kept in the manifest with their `internal_id`,
+        instead of being reported as removed.
+        """
+        ideas = self.ideas
+        removed = []
+        if complete:
+            removed = [i for i in self.previous if i not in self.ideas]
+        else:
+            ideas = {**self.previous, **self.ideas}
+        save_json(self.manifest_path, {"context": self.context_hash, "ideas": ideas})
+        save_json(
+            self.report_path,
+            {"added": self.added, "changed": self.changed, "removed": removed},
+        )
+        print(
+            f"[bold green]Delta import: {len(self.added)} added, "
+            f"{len(self.changed)} changed, {len(removed)} removed, "
+            f"{self.unchanged} unchanged[/bold green]"
+        )
+
+
+class JsonArrayWriter:
+    """
+    Write a JSON array one element at a time, with the same layout produced
+    by `save_json` with the same `serializer`.
+
+    Elements are written to `<path>.partial` and flushed every `flush_every`
+    elements, the file is moved to `path` once the array is closed. If the
+    import stops part-way, the partial file holds every element flushed so far
+    and appending a closing `]` (after a new line, when indented) makes it
+    valid JSON.
+    """
+
+    def __init__(self, path, flush_every=1, serializer=None):
+        self.path = path
+        self.partial_path = f"{path}.partial"
+        self.flush_every = flush_every
+        self.serializer = serializer if serializer is not None else JsonSerializer()
+        self.buffer = []
+        self.count = 0
+        self.file = open(self.partial_path, "w", encoding="utf-8")
+        self.file.write("[")
+
+    def write(self, element):
+        text = self.serializer.dumps(element)
+        if self.serializer.indent:
+            separator = ",\n  " if self.count > 0 else "\n  "
+            text = text.replace("\n", "\n  ")
+        else:
+            separator = "," if self.count > 0 else ""
+        self.buffer.append(separator + text)
+        self.count += 1
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        # Only whole elements are written to the partial file
+        self.file.write("".join(self.buffer))
+        self.file.flush()
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        if self.serializer.indent and self.count > 0:
+            self.file.write("\n")
+        self.file.write("]")
+        self.file.close()
+        os.replace(self.partial_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # Keep the partial file around to recover what was written
+            self.flush()
+            self.file.close()
+
+
+class NdjsonWriter(JsonArrayWriter):
+    """
+    Write one compact JSON document per line. As with `JsonArrayWriter`, the
+    file is moved from `<path>.partial` to `path` once closed.
+    """
+
+    def __init__(self, path, flush_every=1):
+        self.path = path
+        self.partial_path = f"{path}.partial"
+        self.flush_every = flush_every
+        self.serializer = JsonSerializer("compact")
+        self.buffer = []
+        self.count = 0
+        self.file = open(self.partial_path, "w", encoding="utf-8")
+
+    def write(self, element):
+        self.buffer.append(self.serializer.dumps(element) + "\n")
+        self.count += 1
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        os.replace(self.partial_path, self.path)
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise typer.BadParameter(
+            "Parquet and Arrow outputs need pyarrow, install it with "
+            "`pip install pyarrow`"
+        )
+    return pyarrow
+
+
+def arrow_schema(ex_format):
+    # Column types of the exported fields, strings unless stated otherwise
+    pa = import_pyarrow()
+    return pa.schema(
+        [
+            (k, getattr(pa, ARROW_TYPES.get(dtype, "string"))())
+            for k, dtype in ex_format["export_cols"].items()
+        ]
+    )
+
+
+class TableWriter:
+    """
+    Write exported elements to a Parquet or Arrow IPC file, with a column
+    for each field of the format `export_cols`, in batches of `batch_size`
+    rows. Missing fields are saved as nulls, lists and dicts as JSON strings.
+    """
+
+    def __init__(self, path, ex_format, file_format, batch_size=TABLE_BATCH_SIZE):
+        pa = import_pyarrow()
+        self.pa = pa
+        self.path = path
+        self.partial_path = f"{path}.partial"
+        self.batch_size = batch_size
+        self.schema = arrow_schema(ex_format)
+        self.encoded = set(
+            k
+            for k, dtype in ex_format["export_cols"].items()
+            if dtype in ["list", "dict"]
+        )
+        self.rows = []
+        if file_format == "parquet":
+            self.writer = pa.parquet.ParquetWriter(self.partial_path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(self.partial_path, self.schema)
+
+    def write(self, element):
+        self.rows.append(element)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if len(self.rows) == 0:
+            return
+        columns = []
+        for field in self.schema:
+            values = [row.get(field.name) for row in self.rows]
+            if field.name in self.encoded:
+                values = [None if v is None else json.dumps(v) for v in values]
+            columns.append(self.pa.array(values, type=field.type))
+        self.writer.write_batch(
+            self.pa.RecordBatch.from_arrays(columns, schema=self.schema)
+        )
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+        os.replace(self.partial_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.flush()
+            self.writer.close()
+
+
+class OutputWriter:
+    """
+    Write exported elements to `<path>.json` and to each of the additional
+    `output_formats`, saved next to it as `<path>.<format>`.
+    """
+
+    def __init__(
+        self, path, ex_format, output_formats, flush_every=1, serializer=None
+    ):
+        self.writers = [JsonArrayWriter(f"{path}.json", flush_every, serializer)]
+        for output_format in output_formats:
+            if output_format == "ndjson":
+                writer = NdjsonWriter(f"{path}.ndjson", flush_every)
+            else:
+                writer = TableWriter(
+                    f"{path}.{output_format}", ex_format, output_format
+                )
+            self.writers.append(writer)
+
+    @property
+    def count(self):
+        return self.writers[0].count
+
+    def write(self, element):
+        for writer in self.writers:
+            writer.write(element)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        for writer in self.writers:
+            writer.__exit__(exc_type, exc, traceback)
+
+
 def extract_proposers(idea, authors_output):
     contributors = []
     if authors_output == "std" or authors_output == "merged_str":
@@ -459,47 +3022,57 @@ def extract_proposers(idea, authors_output):
         return proposers + contributors
 
 
-def extract_custom_fields(idea, relevant_keys):
-    # Create a temporary idea dict only with relevant keys extracted from
-    # the customFieldsByKey in IdeaScale response
-    temp_idea = {}
-    if "customFieldsByKey" in idea:
-        for k in relevant_keys:
-            if k in idea["customFieldsByKey"]:
-                temp_idea[k] = strip_tags(idea["customFieldsByKey"][k])
-    return temp_idea
-
-
-def extract_relevant_keys(proposal_mappings):
-    relevant_keys = []
-    for k in proposal_mappings:
-        if isinstance(proposal_mappings[k], list):
-            relevant_keys = relevant_keys + proposal_mappings[k]
-        else:
-            relevant_keys.append(proposal_mappings[k])
-    return relevant_keys
+def compile_mappings(proposal_mappings, extra_fields_map):
+    """
+    Compile the proposals and extra fields mappings into a single plan of
+    `(target, field, keys)` rules, in the templates order: `target` is 0 for
+    the mapped fields and 1 for the extra fields, `keys` the custom fields
+    tried in order for `field`, without duplicates.
+    """
+    plan = []
+    for target, mappings in enumerate([proposal_mappings, extra_fields_map]):
+        for field, keys in mappings.items():
+            keys = keys if isinstance(keys, list) else [keys]
+            plan.append((target, field, tuple(dict.fromkeys(keys))))
+    return tuple(plan)
 
 
-def extract_mapping(key, idea):
-    if isinstance(key, list):
-        for k in key:
-            if k in idea and (len(idea[k]) > 0):
-                return idea[k]
-    else:
-        if key in idea:
-            return idea[key]
-    return False
+def resolve_mappings(custom_fields, mapping_plan):
+    """
+    Resolve a plan of `compile_mappings` on the custom fields of an idea,
+    returning its mapped and extra fields. Each field takes the first of its
+    keys that is not empty once stripped of tags, and is left out when none
+    is. Keys are stripped only until one is found, and at most once per idea
+    even when shared by several fields.
+    """
+    resolved = ({}, {})
+    stripped = {}
+    for target, field, keys in mapping_plan:
+        for key in keys:
+            value = stripped.get(key)
+            if value is None:
+                value = strip_tags(custom_fields[key]) if key in custom_fields else ""
+                stripped[key] = value
+            if value:
+                resolved[target][field] = value
+                break
+    return resolved
 
 
-def extract_score(id, assessments):
-    # Query assessments by proposal_id and calculate avg of scores.
-    if assessments is False:
+def extract_score(id, score_index):
+    # Lookup the avg of the assessments scores of a proposal.
+    if score_index is False:
         return "0"
-    mask = assessments.query(f"proposal_id == {id}")
-    score = mask["Rating"].mean()
+    import numpy as np
+
+    score = score_index.get(id, np.nan)
     return str(int(np.round(score, 2) * 100))
 
 
+REWARDS_RE = re.compile(r"(\₳?)(.*)")
+NON_DIGITS_RE = re.compile(r"\D")
+
+
 def parse_rewards(subtitle):
     # Regex to extract budget and currency from 3 different templates:
     # $500,000 in ada
@@ -507,9 +3080,9 @@ def parse_rewards(subtitle):
     # 12,800,000 ada
     rewards = ""
     currency = ""
-    result = re.search(r"(\₳?)(.*)", subtitle)
+    result = REWARDS_RE.search(subtitle)
     if result is not None:
-        rewards = re.sub("\D", "", result.group(2))
+        rewards = NON_DIGITS_RE.sub("", result.group(2))
         currency = result.group(1)
     return rewards, currency
 
@@ -517,54 +3090,159 @@ def parse_rewards(subtitle):
 def extract_challenge_type(title):
     # Actual implementation base on titles. It could be adapted to use
     # different funnel_id
-    if "catalyst natives" in title.lower():
+    title = title.lower()
+    if "catalyst natives" in title:
         return "native"
-    elif "challenge setting" in title.lower():
+    elif "challenge setting" in title:
         return "community-choice"
     else:
         return "simple"
 
 
+WHITESPACE_RE = re.compile(r"[\t ]+")
+
+
 def strip_tags(text):
+    if isinstance(text, str) and "<" not in text and "&" not in text:
+        # Plain text, without tags or entities: apply the same whitespace
+        # collapsing and escaping of markdownify without parsing it.
+        clean_text = WHITESPACE_RE.sub(" ", text)
+        clean_text = clean_text.replace("*", r"\*").replace("_", r"\_")
+        return clean_text.strip()
+    if isinstance(text, str) and len(text) <= STRIP_TAGS_CACHED_LENGTH:
+        # Short fragments (choices, links, flags) are repeated across ideas
+        return _cached_markdownify(text)
+    return _markdownify(text)
+
+
+def _markdownify(text):
+    from markdownify import markdownify as md
+
     tags_to_strip = ["a", "b", "img", "strong", "u", "i", "embed", "iframe"]
     clean_text = md(text, strip=tags_to_strip).strip()
     return clean_text
 
 
-def find_challenge(id, challenges):
-    for c in challenges:
-        if id == c["internal_id"]:
-            return c
+_cached_markdownify = lru_cache(maxsize=STRIP_TAGS_CACHE_SIZE)(_markdownify)
+
+
+def index_challenges(challenges):
+    # Challenges by their Ideascale campaign id, the first one wins as in a
+    # scan of the list
+    return {c["internal_id"]: c for c in reversed(challenges or [])}
+
+
+def find_challenge(id, challenge_index):
+    if id in challenge_index:
+        return challenge_index[id]
     print(f"Error, challenge {id} not found")
-    print(f"Error, challenges {challenges} not found")
     return {}
 
 
-def cast_field(value, dtype):
-    if dtype == "int":
-        return int(value)
-    elif dtype == "float":
-        return float(value)
-    elif dtype == "bool":
-        return value.lower() == "true"
-    elif dtype == "list":
-        return value
-    elif dtype == "dict":
-        return value
-    else:
-        return str(value)
+def cast_bool(value):
+    return value.lower() == "true"
+
+
+# Cast applied to each export type, None keeps the value as it is.
+FIELD_CASTS = {
+    "int": int,
+    "float": float,
+    "bool": cast_bool,
+    "list": None,
+    "dict": None,
+}
+
+
+def compile_format(ex_format):
+    """
+    Resolve the cast of every exported field of a format once, so elements
+    can be exported without looking up the type of each field.
+    Returns a tuple of (field, cast) pairs in the order of `export_cols`.
+    """
+    return tuple(
+        (k, FIELD_CASTS.get(dtype, str))
+        for k, dtype in ex_format["export_cols"].items()
+    )
 
 
 def export_format(elements, ex_format):
     # Map list of elements filtering only valid fields
-    return [
-        dict(
-            (k, cast_field(el[k], ex_format["export_cols"][k]))
-            for k in ex_format["export_cols"].keys()
-            if k in el
-        )
-        for el in elements
-    ]
+    fields = compile_format(ex_format)
+    return [export_element(el, fields) for el in elements]
+
+
+def export_element(el, fields):
+    # Map a single element filtering only valid fields, `fields` is the
+    # result of compile_format
+    return {
+        k: el[k] if cast is None else cast(el[k]) for k, cast in fields if k in el
+    }
+
+
+def export_frame(frame, ex_format):
+    """
+    Export the rows of a DataFrame filtering only valid fields, casting
+    whole columns instead of single values. Produces the same records as
+    `export_format` over `frame.to_dict("records")`.
+    """
+    columns = {}
+    for k, dtype in ex_format["export_cols"].items():
+        if k not in frame:
+            continue
+        column = frame[k]
+        if dtype == "int":
+            column = column.astype("int64").tolist()
+        elif dtype == "float":
+            column = column.astype("float64").tolist()
+        elif dtype == "bool":
+            column = (column.str.lower() == "true").tolist()
+        elif dtype in ("list", "dict"):
+            column = column.tolist()
+        else:
+            column = list(map(str, column.tolist()))
+        columns[k] = column
+    if len(columns) == 0:
+        return [{} for _ in range(len(frame))]
+    keys = list(columns.keys())
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+
+def load_assessments(path, reviews_map, reviews_writer):
+    """
+    Load the assessments CSV in chunks, reading only the columns used by
+    `reviews_map`. The reviews of every chunk are exported and written to
+    `reviews_writer` as they are read, and only the proposal id and rating of
+    each assessment are kept, to compute the proposals scores.
+    """
+    columns = (
+        list(reviews_map["cols"].keys())
+        + reviews_map["rating_cols"]
+        + ["proposal_id"]
+    )
+    columns = list(dict.fromkeys(columns))
+    # Columns without a type of their own are read as text, inferring their
+    # type would depend on the values of each chunk (e.g. a blank id makes
+    # the ids of its chunk floats)
+    dtypes = {col: str for col in columns}
+    dtypes.update(
+        {col: "category" for col in ASSESSMENTS_CATEGORY_COLS if col in columns}
+    )
+    dtypes.update({col: "int64" for col in reviews_map["rating_cols"]})
+    dtypes["proposal_id"] = "int64"
+    import pandas as pd
+
+    ratings = []
+    chunks = pd.read_csv(
+        path, usecols=columns, dtype=dtypes, chunksize=ASSESSMENTS_CHUNK_SIZE
+    )
+    for chunk in chunks:
+        chunk = transform_assessments(chunk, reviews_map)
+        for review in get_reviews(chunk, reviews_map):
+            reviews_writer.write(review)
+        ratings.append(chunk[["proposal_id", "Rating"]])
+    if len(ratings) == 0:
+        return pd.DataFrame({"proposal_id": [], "Rating": []})
+    return pd.concat(ratings, ignore_index=True)
 
 
 def transform_assessments(assessments, reviews_map):
@@ -573,14 +3251,29 @@ def transform_assessments(assessments, reviews_map):
     return assessments
 
 
-def transform_excluded(withdrawn):
+def load_withdrawn(path):
+    # Ids of the withdrawn proposals, only the proposal_id column is read
+    import pandas as pd
+
     print("[yellow]Preparing withdrawn proposals...[/yellow]")
-    if withdrawn is False:
-        return []
-    proposals = withdrawn.to_dict("records")
-    ids = [proposal["proposal_id"] for proposal in proposals]
-    return ids
+    withdrawn = pd.read_csv(path, usecols=["proposal_id"])
+    return withdrawn["proposal_id"].tolist()
 
 
-if __name__ == "__main__":
+def main():
+    # Importing a fund used to be the only command, run without naming it:
+    # `main.py --fund 9 ...` still runs `main.py import-fund --fund 9 ...`
+    commands = [
+        command.name or typer.main.get_command_name(command.callback.__name__)
+        for command in app.registered_commands
+    ]
+    args = sys.argv[1:]
+    if not args or args[0] not in commands + ["--help"] and not args[0].startswith(
+        ("--install-completion", "--show-completion")
+    ):
+        sys.argv.insert(1, "import-fund")
     app()
+
+
+if __name__ == "__main__":
+    main()
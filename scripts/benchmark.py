@@ -0,0 +1,318 @@
+"""
+Benchmark `import_fund` end to end against a local stand-in of the IdeaScale
+API serving a synthetic fund, sampled as by `main.py generate-fund`.
+
+    python scripts/benchmark.py --ideas 10000 --latency 0.05 \
+        --import-args "--concurrency 8"
+
+The stand-in serves the `customFields`, `campaigns/groups`, `stages/.../ideas`
+and `campaigns/.../ideas/status/custom` endpoints used by `main.py`, with a
+configurable latency and rate of 429/5xx errors. The import runs in a
+subprocess with `--metrics` and the results (wall time, requests served, peak
+RSS, timings seen by the stand-in and the importer phases) are printed as JSON, so that runs can be compared across versions.
+
+With `--parse-only` no server is started: the synthetic ideas are parsed
+in-process, page by page as in an import by `--stages`, to measure the
+per-idea parsing path alone.
+
+    python scripts/benchmark.py --ideas 50000 --parse-only
+"""
+import contextlib
+import hashlib
+import json
+import os
+import random
+import re
+import resource
+import shlex
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import typer
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+import main  # noqa: E402
+
+app = typer.Typer()
+
+
+class StandIn:
+    """Local IdeaScale API serving a synthetic fund."""
+
+    def __init__(self, synthetic, latency=0.0, error_rate=0.0, seed=0):
+        self.groups = synthetic["groups"]
+        self.custom_fields = synthetic["custom_fields"]
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rnd = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.first_request = None
+        self.last_request = None
+        self.by_stage = {}
+        self.by_campaign_stage = {}
+        for idea in synthetic["ideas"]:
+            self.by_stage.setdefault(str(idea["stageId"]), []).append(idea)
+            key = (str(idea["campaignId"]), str(idea["stageId"]))
+            self.by_campaign_stage.setdefault(key, []).append(idea)
+
+    def respond(self, path):
+        """Returns the status, headers and body served for `path`."""
+        with self.lock:
+            self.requests += 1
+            now = time.time()
+            self.first_request = self.first_request or now
+            self.last_request = now
+            fail = self.rnd.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            status = self.rnd.choice([429, 500, 502, 503])
+            return status, {"Retry-After": "1"} if status == 429 else {}, b""
+        data = self.route(path)
+        if data is None:
+            return 404, {}, b""
+        body = json.dumps(data).encode()
+        etag = '"{}"'.format(hashlib.md5(body).hexdigest())
+        return 200, {"Content-Type": "application/json", "ETag": etag}, body
+
+    def route(self, path):
+        m = re.match(r"^/a/rest/v1/customFields/idea/campaigns/\d+$", path)
+        if m:
+            return self.custom_fields
+        m = re.match(r"^/a/rest/v1/campaigns/groups/\d+$", path)
+        if m:
+            return self.groups
+        m = re.match(r"^/a/rest/v1/stages/(\w+)/ideas/(\d+)/(\d+)$", path)
+        if m:
+            ideas = self.by_stage.get(m.group(1), [])
+            return page(ideas, int(m.group(2)), int(m.group(3)))
+        m = re.match(
+            r"^/a/rest/v1/campaigns/(\d+)/ideas/status/custom/(\w+)/(\d+)/(\d+)$", path
+        )
+        if m:
+            ideas = self.by_campaign_stage.get((m.group(1), m.group(2)), [])
+            return page(ideas, int(m.group(3)), int(m.group(4)))
+        return None
+
+    def serve(self, port=0):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status, headers, body = stand_in.respond(self.path)
+                if status == 200 and self.headers.get("If-None-Match") == headers["ETag"]:
+                    status, body = 304, b""
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def shutdown(self):
+        self.server.shutdown()
+
+
+def page(ideas, page_number, page_size):
+    return ideas[page_number * page_size : (page_number + 1) * page_size]
+
+
+class StandInClient:
+    """Client answering `main.py` requests from the stand-in, in-process."""
+
+    def __init__(self, stand_in):
+        self.stand_in = stand_in
+
+    def get(self, url, *args, **kwargs):
+        return self.stand_in.route(urlsplit(url).path)
+
+
+def parse_benchmark(stand_in, stage_ids, page_size=50):
+    # Parse every idea in-process, as fetched by stage, timing only parsing
+    client = StandInClient(stand_in)
+    with open(os.path.join(REPO_DIR, "templates", "proposals_map.json")) as f:
+        proposal_mappings = json.load(f)
+    with open(os.path.join(REPO_DIR, "templates", "proposals_extra_fields.json")) as f:
+        extra_fields_map = json.load(f)
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        challenges = main.get_challenges("", 11, 1, client)
+    context = main.get_parse_context(
+        11, challenges, proposal_mappings, extra_fields_map, "private", False, "std"
+    )
+    pages = []
+    for stage in stage_ids:
+        ideas = stand_in.by_stage.get(stage, [])
+        for start in range(0, len(ideas), page_size):
+            pages.append((ideas[start : start + page_size], None))
+    start = time.perf_counter()
+    for ideas, _ in pages:
+        for idea in ideas:
+            main.find_challenge(idea["campaignId"], context["challenge_index"])
+    lookup_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    parsed = sum(1 for _ in main.parse_pages(pages, context))
+    seconds = time.perf_counter() - start
+    return {
+        "ideas": parsed,
+        "challenge_lookup_time": round(lookup_seconds, 3),
+        "parse_time": round(seconds, 3),
+        "ideas_per_second": round(parsed / seconds, 1),
+    }
+
+
+@app.command()
+def benchmark(
+    ideas: int = typer.Option(1000, help="Number of synthetic ideas in the fund"),
+    challenges: int = typer.Option(30, help="Number of synthetic challenges"),
+    stages: int = typer.Option(2, help="Number of stages the ideas are spread on"),
+    reviews_per_idea: int = typer.Option(5, help="Max number of reviews per idea"),
+    latency: float = typer.Option(0.0, help="Seconds added to every response"),
+    error_rate: float = typer.Option(0.0, help="Rate of 429/5xx responses"),
+    stage_keys: bool = typer.Option(
+        False, help="Import with --stage-keys (by challenge) instead of --stages"
+    ),
+    import_args: str = typer.Option("", help="Extra arguments for main.py"),
+    seed: int = typer.Option(42, help="Seed of the synthetic fund"),
+    serve_only: bool = typer.Option(
+        False, help="Only start the stand-in server and print its URL"
+    ),
+    port: int = typer.Option(0, help="Port of the stand-in server"),
+    output: str = typer.Option("", help="File where results are saved as JSON"),
+    parse_only: bool = typer.Option(
+        False, help="Only time the parsing of the ideas, in-process"
+    ),
+):
+    stage_ids = [str(4700 + n) for n in range(stages)]
+    with open(os.path.join(REPO_DIR, "templates", "proposals_map.json")) as f:
+        proposal_mappings = json.load(f)
+    with open(os.path.join(REPO_DIR, "templates", "proposals_extra_fields.json")) as f:
+        extra_fields_map = json.load(f)
+    synthetic = main.generate_synthetic_fund(
+        ideas,
+        challenges,
+        stage_ids,
+        keys=main.synthetic_custom_keys(proposal_mappings, extra_fields_map),
+        reviews_per_idea=reviews_per_idea,
+        seed=seed,
+    )
+    stand_in = StandIn(synthetic, latency, error_rate, seed)
+    if parse_only:
+        results = parse_benchmark(stand_in, stage_ids)
+        print(json.dumps(results, indent=2))
+        if output:
+            with open(output, "w") as f:
+                json.dump(results, f, indent=2)
+        return
+    url = stand_in.serve(port)
+    if serve_only:
+        print(f"Serving {ideas} ideas on {url} (stages {' '.join(stage_ids)})")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            stand_in.shutdown()
+        return
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        assessments = os.path.join(work_dir, "assessments.csv")
+        withdrawn = os.path.join(work_dir, "withdrawn.csv")
+        output_dir = os.path.join(work_dir, "output")
+        os.makedirs(output_dir)
+        main.save_csv(assessments, synthetic["assessments"])
+        main.save_csv(withdrawn, synthetic["withdrawn"])
+        stage_option = "--stage-keys" if stage_keys else "--stages"
+        command = [
+            sys.executable,
+            "main.py",
+            "import-fund",
+            "--ideascale-url",
+            url,
+            "--fund",
+            "11",
+            "--assessments",
+            assessments,
+            "--withdrawn",
+            withdrawn,
+            "--output-dir",
+            output_dir,
+            "--metrics",
+        ]
+        for stage in stage_ids:
+            command += [stage_option, stage]
+        command += shlex.split(import_args)
+
+        start = time.time()
+        process = subprocess.run(
+            command, cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        end = time.time()
+        stand_in.shutdown()
+        if process.returncode != 0:
+            sys.stderr.write(process.stderr.decode())
+        outputs = {
+            name: os.path.getsize(os.path.join(output_dir, name))
+            for name in sorted(os.listdir(output_dir))
+            if os.path.isfile(os.path.join(output_dir, name))
+        }
+        import_metrics = {}
+        metrics_path = os.path.join(output_dir, "metrics.json")
+        if os.path.exists(metrics_path):
+            with open(metrics_path) as f:
+                import_metrics = json.load(f)
+
+    first_request = stand_in.first_request or end
+    last_request = stand_in.last_request or end
+    results = {
+        "ideas": ideas,
+        "challenges": challenges,
+        "stages": stages,
+        "latency": latency,
+        "error_rate": error_rate,
+        "import_args": import_args,
+        "exit_code": process.returncode,
+        "wall_time": round(end - start, 3),
+        "requests": stand_in.requests,
+        "injected_errors": stand_in.errors,
+        # ru_maxrss is in KB on Linux
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1
+        ),
+        "phases": {
+            "startup": round(first_request - start, 3),
+            "requests": round(last_request - first_request, 3),
+            "after_requests": round(end - last_request, 3),
+        },
+        # Time spent in each phase as measured by the importer
+        "import_phases": {
+            phase: round(timer["seconds"], 3)
+            for phase, timer in import_metrics.get("phases", {}).items()
+        },
+        "outputs": outputs,
+    }
+    print(json.dumps(results, indent=2))
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,138 @@
+"""
+Measure the startup of `main.py` with `python -X importtime` and guard its
+import budget:
+
+- importing `main` must take less than `--budget-ms`, and must not import
+  any of `LAZY_MODULES`, which are imported by the code paths using them;
+- parsing proposals without assessments must not import pandas nor numpy.
+
+    python scripts/startup-benchmark.py --budget-ms 500
+
+The import time of `main` (without the modules already loaded by the
+interpreter), its slowest imports and the wall time of `main.py --help` are
+printed as JSON. The exit code is 1 when the budget is not met, so that it
+can run in CI.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+import typer
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = [
+    "pandas",
+    "numpy",
+    "requests",
+    "markdownify",
+    "asyncio",
+    "httpx",
+    "pyarrow",
+]
+# Parses an idea without assessments, then prints the modules loaded
+NO_ASSESSMENTS_RUN = """
+import json, sys
+import main
+
+mappings = json.load(open("templates/proposals_map.json"))
+extra_fields = json.load(open("templates/proposals_extra_fields.json"))
+challenge = {"id": 1, "challenge_type": "simple", "internal_id": 10}
+context = main.get_parse_context(
+    11, [challenge], mappings, extra_fields, "private", False, "std"
+)
+fields = dict.fromkeys(["f11_open_source_choice", "f11_link_1", "f11_link_2"], "")
+fields.update({"f11_link_3": "", main.THEME_CUSTOM_KEY: ""})
+idea = {
+    "id": 1,
+    "campaignId": 10,
+    "title": "Title",
+    "text": "<p>Text</p>",
+    "url": "",
+    "authorInfo": {"name": "Proposer"},
+    "contributors": [],
+    "customFieldsByKey": fields,
+}
+main.parse_page([idea], None, [1], context)
+main.get_scores(False)
+print(json.dumps(sorted(sys.modules)))
+"""
+
+app = typer.Typer()
+
+
+def import_times(code):
+    """Returns the `-X importtime` lines of `code`, as (name, depth, µs)."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        times.append((name.strip(), depth, int(cumulative)))
+    return times, process.stdout
+
+
+@app.command()
+def startup_benchmark(
+    budget_ms: float = typer.Option(500, help="Maximum import time of main"),
+    top: int = typer.Option(10, help="Number of slowest imports printed"),
+):
+    times, _ = import_times("import main")
+    end = next(n for n, (name, _, _) in enumerate(times) if name == "main")
+    start = end
+    while start > 0 and times[start - 1][1] > 0:
+        start -= 1
+    # Modules imported by main itself, not by the interpreter startup, which
+    # are listed before it
+    main_us = times[end][2]
+    imported = {name for name, _, _ in times[start:end]}
+    main_imports = sorted(
+        ((name, us) for name, depth, us in times[start:end] if depth == 1),
+        key=lambda item: -item[1],
+    )
+    _, stdout = import_times(NO_ASSESSMENTS_RUN)
+    no_assessments_modules = set(json.loads(stdout.splitlines()[-1]))
+
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "main.py", "--help"],
+        cwd=REPO_DIR,
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+    help_seconds = time.perf_counter() - start
+
+    violations = []
+    if main_us / 1000 > budget_ms:
+        violations.append(f"main imports in {main_us / 1000:.1f}ms > {budget_ms}ms")
+    for module in LAZY_MODULES:
+        if module in imported:
+            violations.append(f"{module} is imported by main")
+    for module in ["pandas", "numpy"]:
+        if module in no_assessments_modules:
+            violations.append(f"{module} is imported without assessments")
+    results = {
+        "import_ms": round(main_us / 1000, 1),
+        "budget_ms": budget_ms,
+        "slowest_imports_ms": {
+            name: round(us / 1000, 1) for name, us in main_imports[:top]
+        },
+        "help_seconds": round(help_seconds, 3),
+        "violations": violations,
+    }
+    print(json.dumps(results, indent=2))
+    if len(violations) > 0:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
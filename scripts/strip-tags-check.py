@@ -0,0 +1,73 @@
+"""
+Golden check of `strip_tags`: every string of the example proposals is
+stripped by `main.strip_tags` and by the plain markdownify call it
+shortcuts (`main._markdownify`), and the two must be exactly the same.
+
+    python scripts/strip-tags-check.py
+
+It guards the plain text fast path and the memoization of `strip_tags`:
+the exit code is 1 on any mismatch, and the first ones are printed.
+"""
+import glob
+import json
+import os
+import sys
+import warnings
+
+import typer
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+import main  # noqa: E402
+
+app = typer.Typer()
+# BeautifulSoup warns about the example URLs and file names, they're text
+warnings.filterwarnings("ignore", message="The input .* looks more like")
+
+
+def strings(data):
+    """Yields every string found in `data`, keys included."""
+    if isinstance(data, str):
+        yield data
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            yield from strings(key)
+            yield from strings(value)
+    elif isinstance(data, list):
+        for value in data:
+            yield from strings(value)
+
+
+@app.command()
+def strip_tags_check(
+    files: str = typer.Option(
+        "examples/proposals*.json", help="Glob of the JSON files checked"
+    ),
+    show: int = typer.Option(5, help="Number of mismatches printed"),
+):
+    texts = []
+    for path in sorted(glob.glob(os.path.join(REPO_DIR, files))):
+        with open(path) as json_file:
+            texts.extend(strings(json.load(json_file)))
+    if len(texts) == 0:
+        print(f"No strings found in {files}")
+        raise typer.Exit(code=1)
+    mismatches = []
+    # Twice, so that fragments are also checked when memoized
+    for _ in range(2):
+        for text in texts:
+            expected = main._markdownify(text)
+            stripped = main.strip_tags(text)
+            if stripped != expected:
+                mismatches.append((text, expected, stripped))
+    for text, expected, stripped in mismatches[:show]:
+        mismatch = {"text": text, "markdownify": expected, "strip_tags": stripped}
+        print(json.dumps(mismatch))
+    mismatched = len({text for text, _, _ in mismatches})
+    print(f"{len(texts)} strings checked, {mismatched} mismatches")
+    if len(mismatches) > 0:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
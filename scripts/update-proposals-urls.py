@@ -1,25 +1,32 @@
 import json
 
+# Same as `python main.py rewrite-urls`, kept for existing workflows.
+FUND = 10
+
 with open("proposals.json") as proposals_file:
     proposals = json.load(proposals_file)
 
 with open("slug-urls.json") as urls_file:
     urls = json.load(urls_file)
 
+# Index projects by proposal id once, instead of scanning them per proposal
+projects = {row["_id"]: row for row in urls["data"]["fund"]["projects"]}
+
+not_found = []
 for proposal in proposals:
-    found = False
-    for row in urls["data"]["fund"]["projects"]:
-        if row["_id"] == proposal["proposal_id"]:
-            found = True
-            proposal["proposal_url"] = (
-                "https://projectcatalyst.io/funds/10/"
-                + row["challenge"]["slug"]
-                + "/"
-                + row["projectSlug"]
-            )
+    row = projects.get(proposal["proposal_id"])
+    if row is None:
+        not_found.append(proposal["proposal_id"])
+        continue
+    proposal["proposal_url"] = (
+        f"https://projectcatalyst.io/funds/{FUND}/"
+        + row["challenge"]["slug"]
+        + "/"
+        + row["projectSlug"]
+    )
 
-    if not found:
-        print("Not found for proposal id: " + proposal["proposal_id"])
+if len(not_found) > 0:
+    print(f"Not found for {len(not_found)} proposal ids: " + ", ".join(not_found))
 
 json_object = json.dumps(proposals, indent=4)
 with open("proposals-slugs.json", "w") as outfile: